@@ -0,0 +1,56 @@
+"""
+Asyncio API for trackables and trackable_events, for Textual workers.
+Each call runs the blocking function from keeper.api.trackables on a
+dedicated database thread, so the event loop keeps rendering while queries
+run. That thread keeps its own warm connection.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from keeper.api import streaks, trackables
+
+# One thread: queries run in submission order on a single connection
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="keeper-db")
+
+
+async def run(fn: Callable, *args, **kwargs) -> Any:
+    """Await fn(*args, **kwargs) executed on the database thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def _async(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run(fn, *args, **kwargs)
+    return wrapper
+
+
+# --- TRACKABLES ---
+create_trackable = _async(trackables.create_trackable)
+create_trackables_bulk = _async(trackables.create_trackables_bulk)
+get_trackable = _async(trackables.get_trackable)
+list_trackables = _async(trackables.list_trackables)
+list_trackables_with_status = _async(trackables.list_trackables_with_status)
+get_trackables_with_status = _async(trackables.get_trackables_with_status)
+list_trackables_between = _async(trackables.list_trackables_between)
+archive_trackable = _async(trackables.archive_trackable)
+
+# --- TRACKABLE EVENTS ---
+add_trackable_event = _async(trackables.add_trackable_event)
+add_trackable_events_bulk = _async(trackables.add_trackable_events_bulk)
+get_trackable_events = _async(trackables.get_trackable_events)
+get_events_in_range = _async(trackables.get_events_in_range)
+count_events_by_day = _async(trackables.count_events_by_day)
+get_latest_events = _async(trackables.get_latest_events)
+get_trackable_state = _async(trackables.get_trackable_state)
+
+# --- DAILY ROLLUPS ---
+get_daily_rollups = _async(trackables.get_daily_rollups)
+completion_rate = _async(trackables.completion_rate)
+
+# --- STREAKS ---
+get_streak = _async(streaks.get_streak)
+get_streaks = _async(streaks.get_streaks)
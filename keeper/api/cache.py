@@ -0,0 +1,119 @@
+"""
+Process-wide read-through cache for trackable queries.
+Results are keyed by function and arguments. Every write through the API,
+and every get_db() transaction that changes rows (migrations, backfills,
+rollup rebuilds), bumps a generation counter that empties the cache, and
+PRAGMA data_version catches commits made by other connections, including
+other processes.
+"""
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from keeper.api.models import _RowAccess
+from keeper.db.db import get_connection, on_write
+
+# Most query results kept at once
+CACHE_SIZE = 128
+
+
+class QueryCache:
+    """Bounded LRU of query results, emptied whenever the data may have changed."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        # thread id -> (connection, data_version) when that thread last checked
+        self._seen: Dict[int, Tuple[object, int]] = {}
+
+    def invalidate(self):
+        """Drop everything; called after each write."""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.generation += 1
+        self._entries.clear()
+
+    def _check_external_writes(self, conn, version: int):
+        """
+        data_version of a connection changes when any other connection
+        commits. A change since this thread last looked, or a thread/connection
+        we haven't seen, means cached results may be stale. Call with _lock held.
+        """
+        thread_id = threading.get_ident()
+        seen = self._seen.get(thread_id)
+        if seen is None or seen[0] is not conn or seen[1] != version:
+            self._seen[thread_id] = (conn, version)
+            self._clear()
+
+    def get_or_load(self, key: Tuple, load: Callable[[], Any]) -> Any:
+        conn = get_connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        with self._lock:
+            self._check_external_writes(conn, version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self.generation
+        value = load()
+        with self._lock:
+            # Don't store a result that raced with a write
+            if generation == self.generation:
+                self._entries[key] = value
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "generation": self.generation,
+            }
+
+
+_cache = QueryCache()
+# data_version doesn't move for this thread's own commits
+on_write(_cache.invalidate)
+
+
+def _copy(value: Any) -> Any:
+    """Copy of a cached result: lists of rows and rows are copied, other values are immutable."""
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, _RowAccess):
+        return value.copy()
+    return value
+
+
+def cached(fn: Callable) -> Callable:
+    """
+    Serve fn's results from the cache. Every caller, the first included,
+    gets its own copy of the rows, so changing one can't corrupt later hits.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        return _copy(_cache.get_or_load(key, lambda: fn(*args, **kwargs)))
+    return wrapper
+
+
+def invalidate():
+    """Empty the cache after a write."""
+    _cache.invalidate()
+
+
+def cache_info() -> dict:
+    """Hit/miss counters, size and current generation."""
+    return _cache.info()
@@ -0,0 +1,58 @@
+"""
+In-process change notifications for trackables.
+Writes through keeper.api publish a Change naming the trackables they
+touched, so views can patch just those rows instead of reloading. Callbacks
+run on the writing thread once the write is visible to readers.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+TRACKABLE_CREATED = "trackable_created"
+TRACKABLE_ARCHIVED = "trackable_archived"
+EVENT_ADDED = "event_added"
+KINDS = (TRACKABLE_CREATED, TRACKABLE_ARCHIVED, EVENT_ADDED)
+
+
+@dataclass(frozen=True, slots=True)
+class Change:
+    """One write: its kind and the ids of the trackables it affected."""
+    kind: str
+    trackable_ids: Tuple[int, ...]
+
+
+_subscribers: List[Tuple[Callable[[Change], None], Optional[frozenset]]] = []
+_lock = threading.Lock()
+
+
+def subscribe(callback: Callable[[Change], None], kinds: Optional[Iterable[str]] = None) -> Callable[[Change], None]:
+    """
+    Call callback(change) after each write, or only for `kinds`. Callbacks
+    may run on any thread and must be quick. Returns callback, for unsubscribe().
+    """
+    kinds = frozenset(kinds) if kinds is not None else None
+    if kinds is not None and not kinds <= set(KINDS):
+        raise ValueError(f"Unknown change kinds: {sorted(kinds - set(KINDS))}")
+    with _lock:
+        _subscribers.append((callback, kinds))
+    return callback
+
+
+def unsubscribe(callback: Callable[[Change], None]):
+    """Stop calling callback; unknown callbacks are ignored."""
+    with _lock:
+        _subscribers[:] = [entry for entry in _subscribers if entry[0] is not callback]
+
+
+def publish(kind: str, trackable_ids: Iterable[int]):
+    """Tell subscribers that the trackables in trackable_ids changed."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown change kind {kind!r}; expected one of {KINDS}")
+    change = Change(kind, tuple(trackable_ids))
+    if not change.trackable_ids:
+        return
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback, kinds in subscribers:
+        if kinds is None or kind in kinds:
+            callback(change)
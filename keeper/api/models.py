@@ -0,0 +1,196 @@
+"""
+Typed row models returned by keeper.api.trackables.
+Slotted dataclasses keep per-row memory low; JSON columns are decoded on
+first access and cached. Models still support row['key'] and row.get()
+so code written against the old dict rows keeps working.
+"""
+import json
+import sqlite3
+import sys
+from dataclasses import dataclass, field, fields
+from typing import Any, List, Optional
+
+# Marks a JSON column that hasn't been decoded yet
+_UNSET = object()
+
+
+def _decode(raw: Optional[str]) -> Any:
+    """Decode a JSON column; missing or malformed JSON becomes {}."""
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return {}
+
+
+class _RowAccess:
+    """Mapping-style access to public fields, like sqlite3.Row."""
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key.startswith("_") or key not in self._field_names():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self._field_names()
+
+    def copy(self):
+        """A copy sharing nothing with this row; its JSON is decoded again on access."""
+        return type(self)(*[getattr(self, name) for name in self._field_names()])
+
+    @classmethod
+    def _field_names(cls) -> tuple:
+        names = cls.__dict__.get("_names")
+        if names is None:
+            names = tuple(f.name for f in fields(cls) if not f.name.startswith("_"))
+            cls._names = names
+        return names
+
+
+@dataclass(slots=True)
+class TrackableState(_RowAccess):
+    """Current status of a trackable (see the trackable_state table)."""
+    trackable_id: int
+    completed: bool = False
+    status_at: Optional[str] = None
+    event_count: int = 0
+    last_event_id: Optional[int] = None
+    last_event_type: Optional[str] = None
+    last_event_at: Optional[str] = None
+    last_value: Optional[float] = None
+
+
+@dataclass(slots=True)
+class Trackable(_RowAccess):
+    """A row of trackables, optionally with its state joined in."""
+    id: int
+    type: str
+    plugin_owner: str
+    name: str
+    description: Optional[str] = None
+    color: Optional[str] = None
+    points: int = 1
+    config_json: Optional[str] = None
+    created_at: Optional[str] = None
+    archived_at: Optional[str] = None
+    # Generated column: config's task_date, else the created_at day
+    task_date: Optional[str] = None
+    # Filled by list_trackables_with_status()
+    completed: bool = False
+    status_at: Optional[str] = None
+    event_count: int = 0
+    last_event_id: Optional[int] = None
+    last_event_type: Optional[str] = None
+    last_event_at: Optional[str] = None
+    last_value: Optional[float] = None
+    _config: Any = field(default=_UNSET, init=False, repr=False, compare=False)
+
+    @property
+    def config(self) -> dict:
+        """config_json decoded on first access; {} unless it holds an object."""
+        if self._config is _UNSET:
+            config = _decode(self.config_json)
+            self._config = config if isinstance(config, dict) else {}
+        return self._config
+
+
+@dataclass(slots=True)
+class TrackableEvent(_RowAccess):
+    """A row of trackable_events. id is None for queued, unwritten events."""
+    id: Optional[int]
+    trackable_id: int
+    event_type: str
+    value: Optional[float] = None
+    note: Optional[str] = None
+    data_json: Optional[str] = None
+    created_at: Optional[str] = None
+    _data: Any = field(default=_UNSET, init=False, repr=False, compare=False)
+
+    @property
+    def data(self) -> Any:
+        """data_json decoded on first access."""
+        if self._data is _UNSET:
+            self._data = _decode(self.data_json)
+        return self._data
+
+
+@dataclass(slots=True)
+class DailyRollup(_RowAccess):
+    """Totals of one (day, type, plugin_owner) group (see the daily_rollup table)."""
+    day: str
+    type: str
+    plugin_owner: str
+    total_count: int = 0
+    completed_count: int = 0
+    points_earned: int = 0
+    points_possible: int = 0
+
+
+@dataclass(slots=True)
+class Streak(_RowAccess):
+    """Streak of a trackable (see keeper.api.streaks)."""
+    trackable_id: int
+    current_streak: int = 0
+    longest_streak: int = 0
+    last_counted_day: Optional[str] = None
+    # Events accounted for; differs from trackable_state's when out of date
+    event_count: int = 0
+
+
+@dataclass(slots=True)
+class CompletionRate:
+    """Result of completion_rate(): lists parallel to `buckets`, one entry per bucket."""
+    granularity: str
+    buckets: List[str] = field(default_factory=list)
+    total_count: List[int] = field(default_factory=list)
+    completed_count: List[int] = field(default_factory=list)
+    points_earned: List[int] = field(default_factory=list)
+    points_possible: List[int] = field(default_factory=list)
+
+    @property
+    def rates(self) -> List[float]:
+        """Share of trackables completed per bucket (0.0 when empty)."""
+        return [done / total if total else 0.0 for done, total in zip(self.completed_count, self.total_count)]
+
+    @property
+    def points_rates(self) -> List[float]:
+        """Share of points earned per bucket (0.0 when empty)."""
+        return [earned / possible if possible else 0.0
+                for earned, possible in zip(self.points_earned, self.points_possible)]
+
+
+# Low-cardinality text columns shared across rows instead of copied per row
+_INTERNED = {"type", "plugin_owner", "event_type", "last_event_type"}
+
+
+def _row_factory(model):
+    known = set(model._field_names())
+
+    def factory(cursor: sqlite3.Cursor, row: tuple):
+        values = {}
+        for (name, *_), value in zip(cursor.description, row):
+            if name in known:
+                if name in _INTERNED and value is not None:
+                    value = sys.intern(value)
+                elif name == "completed":
+                    value = bool(value)
+                values[name] = value
+        return model(**values)
+
+    return factory
+
+
+# Set as cursor.row_factory; columns the model doesn't know are ignored
+trackable_row = _row_factory(Trackable)
+event_row = _row_factory(TrackableEvent)
+state_row = _row_factory(TrackableState)
+rollup_row = _row_factory(DailyRollup)
+streak_row = _row_factory(Streak)
@@ -0,0 +1,381 @@
+"""
+Streaks: how many consecutive repeat periods of a trackable have a completion.
+
+A trackable repeats by the "repeat_rule" in its config_json, a subset of
+RRULE (FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL, BYDAY, DTSTART), e.g.
+"RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=FR" for every other Friday; without one
+it repeats daily from its task_date. Each occurrence opens a period lasting
+until the next one, and a period counts when one of its days ends completed
+(that day's last completed/uncompleted event is a completion). Days are UTC,
+like created_at.
+
+The trackable_streaks table caches each streak. Event writes through
+keeper.api update it in O(1); backdated completions, undone ones
+(uncompleted events) and events older than another on their day only
+recount the run they touch. Rows that no longer
+match trackable_state's event count, e.g. after events were written or
+deleted outside keeper.api, are recomputed on the next read.
+"""
+import calendar
+import heapq
+import json
+from collections import deque
+from dataclasses import replace
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from keeper.api import write_queue
+from keeper.api.models import Streak, streak_row
+from keeper.db.db import get_db
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+STATUS_EVENT_TYPES = ("completed", "uncompleted")
+
+SAVE_STREAK_SQL = """
+INSERT OR REPLACE INTO trackable_streaks (trackable_id, current_streak, longest_streak,
+                                          last_counted_day, event_count)
+VALUES (:trackable_id, :current_streak, :longest_streak, :last_counted_day, :event_count)
+"""
+
+
+class RepeatRule:
+    """When a trackable repeats. Numbers its periods from the anchor day (period 0)."""
+
+    def __init__(self, freq: str = "DAILY", interval: int = 1, byday: Optional[List[int]] = None,
+                 anchor: date = date(1970, 1, 1)):
+        if freq == "YEARLY":
+            freq, interval = "MONTHLY", interval * 12
+        self.freq = freq
+        self.interval = interval
+        self.anchor = anchor
+        self.byday = sorted(set(byday)) if byday else [anchor.weekday()]
+        # Monday of the anchor's week; weekly cycles start there
+        self.week0 = anchor - timedelta(days=anchor.weekday())
+
+    @classmethod
+    def parse(cls, rule: Optional[str], anchor: date) -> "RepeatRule":
+        """Parse an RRULE string; unknown or missing parts fall back to daily."""
+        parts = {}
+        for part in (rule or "").upper().removeprefix("RRULE:").split(";"):
+            key, _, value = part.partition("=")
+            parts[key.strip()] = value.strip()
+        if parts.get("DTSTART"):
+            try:
+                anchor = datetime.strptime(parts["DTSTART"][:8], "%Y%m%d").date()
+            except ValueError:
+                pass
+        interval = parts.get("INTERVAL", "")
+        byday = [WEEKDAYS.index(d[-2:]) for d in parts.get("BYDAY", "").split(",") if d[-2:] in WEEKDAYS]
+        return cls(
+            parts["FREQ"] if parts.get("FREQ") in FREQUENCIES else "DAILY",
+            int(interval) if interval.isdigit() and int(interval) > 0 else 1,
+            byday,
+            anchor,
+        )
+
+    def period(self, day: date) -> int:
+        """Number of the period containing `day` (negative before the anchor)."""
+        if self.freq == "DAILY":
+            return (day - self.anchor).days // self.interval
+        if self.freq == "WEEKLY":
+            cycle, week = divmod((day - self.week0).days // 7, self.interval)
+            if week == 0:
+                held = sum(1 for weekday in self.byday if weekday <= day.weekday())
+            else:
+                held = len(self.byday)
+            return cycle * len(self.byday) + held - 1
+        months = (day.year - self.anchor.year) * 12 + day.month - self.anchor.month
+        if day.day < min(self.anchor.day, calendar.monthrange(day.year, day.month)[1]):
+            months -= 1
+        return months // self.interval
+
+    def start(self, period: int) -> date:
+        """First day of `period`."""
+        if self.freq == "DAILY":
+            return self.anchor + timedelta(days=period * self.interval)
+        if self.freq == "WEEKLY":
+            cycle, index = divmod(period, len(self.byday))
+            return self.week0 + timedelta(weeks=cycle * self.interval, days=self.byday[index])
+        months = self.anchor.month - 1 + period * self.interval
+        year, month = self.anchor.year + months // 12, months % 12 + 1
+        return date(year, month, min(self.anchor.day, calendar.monthrange(year, month)[1]))
+
+
+def _now() -> str:
+    """datetime('now') as a created_at string."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _utc_day(created_at: Optional[str]) -> date:
+    return date.fromisoformat(created_at[:10]) if created_at else datetime.now(timezone.utc).date()
+
+
+def _rules(conn, trackable_ids: List[int]) -> Dict[int, RepeatRule]:
+    """Repeat rule of each existing trackable."""
+    rules = {}
+    for trackable_id, config_json, task_date, created_at in conn.execute(
+        """
+        SELECT id, config_json, task_date, created_at FROM trackables
+        WHERE id IN (SELECT value FROM json_each(?))
+        """,
+        (json.dumps(trackable_ids),),
+    ):
+        try:
+            anchor = date.fromisoformat(str(task_date)[:10])
+        except ValueError:
+            anchor = _utc_day(created_at)
+        try:
+            config = json.loads(config_json) if config_json else {}
+        except ValueError:
+            config = {}
+        rule = config.get("repeat_rule") if isinstance(config, dict) else None
+        rules[trackable_id] = RepeatRule.parse(rule if isinstance(rule, str) else None, anchor)
+    return rules
+
+
+# --- WALKING COMPLETED DAYS ---
+def _db_days(conn, trackable_id: int, descending: bool, since: Optional[date], until: Optional[date]) -> Iterator[date]:
+    """Completed days in [since, until) from the database, read lazily in order."""
+    order = "DESC" if descending else "ASC"
+    rows = conn.execute(
+        f"""
+        SELECT substr(created_at, 1, 10), event_type FROM trackable_events
+        WHERE trackable_id = ? AND created_at >= ? AND created_at < ?
+          AND event_type IN ('completed', 'uncompleted')
+        ORDER BY created_at {order}, id {order}
+        """,
+        (trackable_id, since.isoformat() if since else "", until.isoformat() if until else "9999-12-31"),
+    )
+    for day, events in groupby(rows, key=lambda row: row[0]):
+        # A day's status is its last event
+        last = next(events) if descending else deque(events, maxlen=1)[0]
+        if last[1] == "completed":
+            yield date.fromisoformat(day)
+
+
+def _completed_days(conn, trackable_id: int, descending: bool = False, since: Optional[date] = None,
+                    until: Optional[date] = None, overlay: Optional[Dict[date, bool]] = None) -> Iterator[date]:
+    """Completed days in order; `overlay` ({day: completed}) overrides the database."""
+    days = _db_days(conn, trackable_id, descending, since, until)
+    if not overlay:
+        return days
+    extra = sorted(
+        (day for day, done in overlay.items()
+         if done and (since is None or day >= since) and (until is None or day < until)),
+        reverse=descending,
+    )
+    return heapq.merge((day for day in days if day not in overlay), extra, reverse=descending)
+
+
+def _consecutive(periods: Iterable[int], start: int, step: int) -> int:
+    """How many consecutive periods from `start`, going by `step`, are in `periods` (sorted that way)."""
+    count, expected = 0, start
+    for period in periods:
+        if (period - expected) * step < 0:
+            # Another day of a period already counted
+            continue
+        if period != expected:
+            break
+        count += 1
+        expected += step
+    return count
+
+
+# --- UPDATING ---
+def _superseded(conn, trackable_id: int, created_at: str) -> bool:
+    """Whether a later completed/uncompleted event already decides created_at's day."""
+    return conn.execute(
+        """
+        SELECT 1 FROM trackable_events
+        WHERE trackable_id = ? AND event_type IN ('completed', 'uncompleted')
+          AND created_at > ? AND created_at < ?
+        LIMIT 1
+        """,
+        (trackable_id, created_at, (_utc_day(created_at) + timedelta(days=1)).isoformat()),
+    ).fetchone() is not None
+
+
+def _advance(streak: Streak, rule: RepeatRule, day: date) -> bool:
+    """O(1) update for a completion on `day`. False if it lands before the last counted period."""
+    if streak.last_counted_day is None:
+        streak.current_streak = 1
+    else:
+        last = date.fromisoformat(streak.last_counted_day)
+        period, last_period = rule.period(day), rule.period(last)
+        if period < last_period:
+            return False
+        if period == last_period:
+            if day > last:
+                streak.last_counted_day = day.isoformat()
+            return True
+        streak.current_streak = streak.current_streak + 1 if period == last_period + 1 else 1
+    streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+    streak.last_counted_day = day.isoformat()
+    return True
+
+
+def _compute(conn, trackable_id: int, rule: RepeatRule, overlay: Optional[Dict[date, bool]] = None) -> Streak:
+    """Streak from the trackable's whole history."""
+    streak = Streak(trackable_id)
+    for day in _completed_days(conn, trackable_id, overlay=overlay):
+        _advance(streak, rule, day)
+    return streak
+
+
+def _recount(conn, streak: Streak, rule: RepeatRule, day: date, completed: bool,
+             overlay: Optional[Dict[date, bool]] = None):
+    """Bounded recount after a backdated, undone or superseded completion on `day`."""
+    trackable_id = streak.trackable_id
+    newest = next(_completed_days(conn, trackable_id, True, overlay=overlay), None)
+    if newest is None:
+        streak.current_streak, streak.last_counted_day = 0, None
+    else:
+        newest_period = rule.period(newest)
+        earlier = _completed_days(conn, trackable_id, True, until=rule.start(newest_period), overlay=overlay)
+        streak.current_streak = 1 + _consecutive(map(rule.period, earlier), newest_period - 1, -1)
+        streak.last_counted_day = newest.isoformat()
+
+    # Length of the run through day's period, walking out from it both ways
+    period = rule.period(day)
+    before = _consecutive(
+        map(rule.period, _completed_days(conn, trackable_id, True, until=rule.start(period), overlay=overlay)),
+        period - 1, -1,
+    )
+    after = _consecutive(
+        map(rule.period, _completed_days(conn, trackable_id, since=rule.start(period + 1), overlay=overlay)),
+        period + 1, 1,
+    )
+    # A completion counts only if it is its day's last event
+    done = next(_completed_days(
+        conn, trackable_id, since=rule.start(period), until=rule.start(period + 1), overlay=overlay
+    ), None) is not None
+    if done:
+        streak.longest_streak = max(streak.longest_streak, before + 1 + after)
+    elif not completed and before + 1 + after >= streak.longest_streak:
+        # The undone period split what may have been the longest run
+        streak.longest_streak = _compute(conn, trackable_id, rule, overlay).longest_streak
+    streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+
+
+def _apply_event(conn, streak: Streak, rule: RepeatRule, event_type: str, day: date,
+                 overlay: Optional[Dict[date, bool]] = None, superseded: bool = False):
+    """
+    Fold an event on `day` into streak. Only an in-order completion after
+    the last counted day takes the O(1) path.
+    """
+    last = date.fromisoformat(streak.last_counted_day) if streak.last_counted_day else None
+    if superseded:
+        _recount(conn, streak, rule, day, event_type == "completed", overlay)
+    elif event_type == "completed":
+        if (last is not None and day <= last) or not _advance(streak, rule, day):
+            _recount(conn, streak, rule, day, True, overlay)
+    elif event_type == "uncompleted":
+        # Nothing after the last counted day was completed, so undoing it changes nothing
+        if last is not None and day <= last:
+            _recount(conn, streak, rule, day, False, overlay)
+
+
+def _event_counts(conn, trackable_ids: List[int]) -> Dict[int, int]:
+    return dict(conn.execute(
+        """
+        SELECT trackable_id, event_count FROM trackable_state
+        WHERE trackable_id IN (SELECT value FROM json_each(?))
+        """,
+        (json.dumps(trackable_ids),),
+    ).fetchall())
+
+
+def _load(conn, trackable_ids: List[int]) -> Dict[int, Streak]:
+    cursor = conn.cursor()
+    cursor.row_factory = streak_row
+    cursor.execute(
+        "SELECT * FROM trackable_streaks WHERE trackable_id IN (SELECT value FROM json_each(?))",
+        (json.dumps(trackable_ids),),
+    )
+    return {streak.trackable_id: streak for streak in cursor.fetchall()}
+
+
+def record_events(conn, events: Iterable[Tuple[int, str, Optional[str]]]):
+    """
+    Update streaks for events just written on `conn`, inside the same
+    transaction. Each item is (trackable_id, event_type, created_at) in
+    write order; created_at None means now.
+    """
+    written: Dict[int, List[Tuple[str, Optional[str]]]] = {}
+    for trackable_id, event_type, created_at in events:
+        written.setdefault(trackable_id, []).append((event_type, created_at))
+    ids = list(written)
+    counts = _event_counts(conn, ids)
+    streaks = _load(conn, ids)
+    rules = _rules(conn, ids)
+    for trackable_id, new_events in written.items():
+        if trackable_id not in rules:
+            # Trackable deleted meanwhile; its events weren't written
+            continue
+        count = counts.get(trackable_id, 0)
+        streak = streaks.get(trackable_id)
+        if streak is None or streak.event_count != count - len(new_events):
+            # Not in step with the events before these; start over
+            streak = _compute(conn, trackable_id, rules[trackable_id])
+        else:
+            for event_type, created_at in new_events:
+                created_at = created_at or _now()
+                _apply_event(conn, streak, rules[trackable_id], event_type, _utc_day(created_at),
+                             superseded=_superseded(conn, trackable_id, created_at))
+        streak.event_count = count
+        conn.execute(SAVE_STREAK_SQL, _params(streak))
+
+
+def _params(streak: Streak) -> dict:
+    return {name: getattr(streak, name) for name in streak.keys()}
+
+
+# --- READING ---
+def get_streaks(trackable_ids: Iterable[int]) -> Dict[int, Streak]:
+    """
+    Streaks of several trackables, including queued events. current_streak
+    is 0 once the period after last_counted_day has passed without a
+    completion. Trackables that don't exist are left out.
+    """
+    ids = list(trackable_ids)
+    today = datetime.now(timezone.utc).date()
+    result = {}
+    with write_queue.visible(), get_db() as conn:
+        counts = _event_counts(conn, ids)
+        streaks = _load(conn, ids)
+        rules = _rules(conn, ids)
+        pending: Dict[int, list] = {}
+        for event in write_queue.pending_events():
+            if event["trackable_id"] in rules and event["event_type"] in STATUS_EVENT_TYPES:
+                pending.setdefault(event["trackable_id"], []).append(event)
+        for trackable_id, rule in rules.items():
+            streak = streaks.get(trackable_id)
+            count = counts.get(trackable_id, 0)
+            if streak is None or streak.event_count != count:
+                streak = _compute(conn, trackable_id, rule)
+                streak.event_count = count
+                conn.execute(SAVE_STREAK_SQL, _params(streak))
+            if trackable_id in pending:
+                # Fold in queued events without saving them
+                streak = replace(streak)
+                overlay, latest = {}, {}
+                for event in pending[trackable_id]:
+                    created_at = event["created_at"]
+                    day = _utc_day(created_at)
+                    superseded = created_at < latest.get(day, "") or _superseded(conn, trackable_id, created_at)
+                    if not superseded:
+                        overlay[day] = event["event_type"] == "completed"
+                        latest[day] = created_at
+                    _apply_event(conn, streak, rule, event["event_type"], day, overlay, superseded)
+            if streak.last_counted_day is not None and \
+                    rule.period(today) > rule.period(date.fromisoformat(streak.last_counted_day)) + 1:
+                streak = replace(streak, current_streak=0)
+            result[trackable_id] = streak
+    return result
+
+
+def get_streak(trackable_id: int) -> Optional[Streak]:
+    """Streak of one trackable (see get_streaks()); None if it doesn't exist."""
+    return get_streaks([trackable_id]).get(trackable_id)
@@ -1,8 +1,63 @@
 """
 API for trackables and trackable_events
 """
-from typing import Optional, List, Dict, Any
+import json
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Optional, List, Dict, Any, Callable, Iterable, Iterator, Tuple, Union
 from keeper.db.db import get_db
+from keeper.api import changes, streaks, write_queue
+from keeper.api.cache import cached, invalidate
+from keeper.api.models import CompletionRate, DailyRollup, Trackable, TrackableEvent, TrackableState, event_row, rollup_row, state_row, trackable_row
+
+# Default number of rows written per transaction by the bulk APIs
+BULK_CHUNK_SIZE = 1000
+# Default number of rows fetched per query by the iter_* APIs
+PAGE_SIZE = 500
+
+TRACKABLE_FIELDS = ("type_", "plugin_owner", "name", "description", "color", "points", "config_json", "created_at")
+EVENT_FIELDS = ("trackable_id", "event_type", "value", "note", "data_json", "created_at")
+_FIELD_DEFAULTS = {"points": 1}
+
+INSERT_EVENT_SQL = """
+INSERT INTO trackable_events (trackable_id, event_type, value, note, data_json, created_at)
+VALUES (?, ?, ?, ?, ?, COALESCE(?, datetime('now')))
+"""
+
+
+def _normalize_rows(rows: Iterable[Union[tuple, dict]], fields: tuple) -> Iterable[tuple]:
+    """
+    Turn tuples (in `fields` order, trailing fields optional), dicts keyed
+    by field name or row models into full parameter tuples. `type` is
+    accepted for `type_`.
+    """
+    for row in rows:
+        if hasattr(row, "keys"):
+            row = {("type_" if key == "type" else key): row[key] for key in row.keys()}
+            yield tuple(row.get(field, _FIELD_DEFAULTS.get(field)) for field in fields)
+        else:
+            row = tuple(row)
+            yield row + tuple(_FIELD_DEFAULTS.get(field) for field in fields[len(row):])
+
+
+def _insert_chunked(sql: str, rows: Iterable[tuple], chunk_size: int, after_chunk: Callable, change: str) -> int:
+    """
+    executemany `rows` in chunks, committing once per chunk. Returns the row
+    count. after_chunk(conn, chunk) runs in each chunk's transaction and
+    returns the trackable ids published as a `change` once the chunk commits.
+    """
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return total
+        with get_db() as conn:
+            conn.executemany(sql, chunk)
+            trackable_ids = after_chunk(conn, chunk)
+        invalidate()
+        changes.publish(change, trackable_ids)
+        total += len(chunk)
 
 # --- TRACKABLES ---
 def create_trackable(type_: str, plugin_owner: str, name: str, description: Optional[str] = None, color: Optional[str] = None, points: int = 1, config_json: Optional[str] = None) -> int:
@@ -16,38 +71,162 @@ def create_trackable(type_: str, plugin_owner: str, name: str, description: Opti
             """,
             (type_, plugin_owner, name, description, color, points, config_json)
         )
-        return cursor.lastrowid
+    invalidate()
+    changes.publish(changes.TRACKABLE_CREATED, [cursor.lastrowid])
+    return cursor.lastrowid
+
+def _created_ids(conn, chunk: List[tuple]) -> List[int]:
+    """Ids of the chunk just inserted: each new rowid is max(rowid) + 1, so they're the top len(chunk)."""
+    return [row[0] for row in conn.execute(
+        "SELECT id FROM trackables WHERE id > (SELECT max(id) FROM trackables) - ? ORDER BY id",
+        (len(chunk),),
+    )]
 
-def get_trackable(trackable_id: int) -> Optional[dict]:
+def create_trackables_bulk(trackables: Iterable[Union[tuple, dict]], chunk_size: int = BULK_CHUNK_SIZE) -> int:
+    """
+    Create many trackables with one transaction per chunk_size rows.
+    Each item is a tuple in TRACKABLE_FIELDS order or a dict with those keys;
+    created_at defaults to now. Returns the number of trackables created.
+    """
+    return _insert_chunked(
+        """
+        INSERT INTO trackables (type, plugin_owner, name, description, color, points, config_json, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, datetime('now')))
+        """,
+        _normalize_rows(trackables, TRACKABLE_FIELDS),
+        chunk_size,
+        _created_ids,
+        changes.TRACKABLE_CREATED,
+    )
+
+@cached
+def get_trackable(trackable_id: int) -> Optional[Trackable]:
     with get_db() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = trackable_row
         cursor.execute("SELECT * FROM trackables WHERE id = ?", (trackable_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        return cursor.fetchone()
 
-def list_trackables(type_: Optional[str] = None, plugin_owner: Optional[str] = None, archived: Optional[bool] = None) -> List[dict]:
-    query = "SELECT * FROM trackables WHERE 1=1"
+def _trackable_filters(type_: Optional[str], plugin_owner: Optional[str], archived: Optional[bool], alias: str = "") -> tuple:
+    """WHERE clause and params shared by the trackable listing queries."""
+    query = "1=1"
     params = []
     if type_:
-        query += " AND type = ?"
+        query += f" AND {alias}type = ?"
         params.append(type_)
     if plugin_owner:
-        query += " AND plugin_owner = ?"
+        query += f" AND {alias}plugin_owner = ?"
         params.append(plugin_owner)
     if archived is not None:
         if archived:
-            query += " AND archived_at IS NOT NULL"
+            query += f" AND {alias}archived_at IS NOT NULL"
         else:
-            query += " AND archived_at IS NULL"
+            query += f" AND {alias}archived_at IS NULL"
+    return query, params
+
+@cached
+def list_trackables(type_: Optional[str] = None, plugin_owner: Optional[str] = None, archived: Optional[bool] = None) -> List[Trackable]:
+    where, params = _trackable_filters(type_, plugin_owner, archived)
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        cursor.row_factory = trackable_row
+        cursor.execute(f"SELECT * FROM trackables WHERE {where}", params)
+        return cursor.fetchall()
+
+# Trackables joined with their state; append WHERE/ORDER BY using the t. alias
+SELECT_WITH_STATUS_SQL = """
+SELECT t.*, COALESCE(s.completed, 0) AS completed, s.status_at,
+       COALESCE(s.event_count, 0) AS event_count, s.last_event_id,
+       s.last_event_type, s.last_event_at, s.last_value
+FROM trackables AS t
+LEFT JOIN trackable_state AS s ON s.trackable_id = t.id
+"""
+
+def _select_with_status(clauses: str, params: Union[list, dict]) -> List[Trackable]:
+    """Run SELECT_WITH_STATUS_SQL + clauses and fold in queued events."""
+    with write_queue.visible(), get_db() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = trackable_row
+        cursor.execute(SELECT_WITH_STATUS_SQL + clauses, params)
+        rows = cursor.fetchall()
+        pending = _group_by_trackable(_pending_events())
+    for row in rows:
+        _apply_pending(row, pending.get(row.id, []))
+    return rows
+
+@cached
+def list_trackables_with_status(type_: Optional[str] = None, plugin_owner: Optional[str] = None, archived: Optional[bool] = None) -> List[Trackable]:
+    """
+    Like list_trackables(), with each trackable's current state (see
+    get_trackable_state()) filled in, in a single query. Results are cached
+    until the next write; don't modify the returned rows.
+    """
+    where, params = _trackable_filters(type_, plugin_owner, archived, alias="t.")
+    return _select_with_status(f"WHERE {where}", params)
+
+def get_trackables_with_status(trackable_ids: Iterable[int]) -> List[Trackable]:
+    """
+    The given trackables with their state, as in list_trackables_with_status(),
+    in id order; unknown ids are left out. For refreshing only the rows a
+    change touched.
+    """
+    return _select_with_status(
+        "WHERE t.id IN (SELECT value FROM json_each(?)) ORDER BY t.id",
+        [json.dumps(list(trackable_ids))],
+    )
+
+def _day(value: Union[str, date]) -> str:
+    """'YYYY-MM-DD' of a date, datetime or string, comparable with task_date and rollup days."""
+    return value.strftime("%Y-%m-%d") if isinstance(value, date) else value[:10]
+
+def _timestamp(value: Union[str, date]) -> str:
+    """'YYYY-MM-DD HH:MM:SS' of a datetime ('YYYY-MM-DD' of a date), comparable with created_at."""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value.strftime("%Y-%m-%d") if isinstance(value, date) else value
+
+@cached
+def list_trackables_between(start: Union[str, date], end: Union[str, date], type_: str = "task", plugin_owner: Optional[str] = None, archived: Optional[bool] = False) -> List[Trackable]:
+    """
+    Trackables whose task_date falls in [start, end), with status as in
+    list_trackables_with_status(), ordered by task_date. Dates are date
+    objects or 'YYYY-MM-DD'. Only the range is read, via the task_date index.
+    """
+    where, params = _trackable_filters(type_, plugin_owner, archived, alias="t.")
+    return _select_with_status(
+        f"WHERE {where} AND t.task_date >= ? AND t.task_date < ? ORDER BY t.task_date, t.id",
+        params + [_day(start), _day(end)],
+    )
+
+def iter_trackables(type_: Optional[str] = None, plugin_owner: Optional[str] = None, archived: Optional[bool] = None, after: Optional[int] = None, limit: Optional[int] = None, page_size: int = PAGE_SIZE) -> Iterator[Trackable]:
+    """
+    Yield trackables in id order, fetching page_size rows per query so any
+    number of rows is processed in constant memory. Pass the last seen id as
+    `after` to resume.
+    """
+    where, params = _trackable_filters(type_, plugin_owner, archived)
+    yielded = 0
+    while limit is None or yielded < limit:
+        size = page_size if limit is None else min(page_size, limit - yielded)
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = trackable_row
+            rows = cursor.execute(
+                f"SELECT * FROM trackables WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+                params + [after if after is not None else 0, size],
+            ).fetchall()
+        yield from rows
+        yielded += len(rows)
+        if len(rows) < size:
+            return
+        after = rows[-1].id
 
 def archive_trackable(trackable_id: int):
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE trackables SET archived_at = datetime('now') WHERE id = ?", (trackable_id,))
+    invalidate()
+    changes.publish(changes.TRACKABLE_ARCHIVED, [trackable_id])
 
 # --- TRACKABLE EVENTS ---
 def add_trackable_event(trackable_id: int, event_type: str, value: Optional[float] = None, note: Optional[str] = None, data_json: Optional[str] = None) -> int:
@@ -60,17 +239,338 @@ def add_trackable_event(trackable_id: int, event_type: str, value: Optional[floa
             """,
             (trackable_id, event_type, value, note, data_json)
         )
-        return cursor.lastrowid
+        streaks.record_events(conn, [(trackable_id, event_type, None)])
+    invalidate()
+    changes.publish(changes.EVENT_ADDED, [trackable_id])
+    return cursor.lastrowid
+
+def _record_chunk(conn, chunk: List[tuple]) -> List[int]:
+    """Update streaks for a chunk of new events; returns their trackable ids."""
+    streaks.record_events(conn, [(row[0], row[1], row[5]) for row in chunk])
+    return list(dict.fromkeys(row[0] for row in chunk))
 
-def get_trackable_events(trackable_id: int, event_type: Optional[str] = None) -> List[dict]:
+def add_trackable_events_bulk(events: Iterable[Union[tuple, dict]], chunk_size: int = BULK_CHUNK_SIZE) -> int:
+    """
+    Add many events with one transaction per chunk_size rows, e.g. when
+    importing history. Each item is a tuple in EVENT_FIELDS order or a dict
+    with those keys; created_at defaults to now. Returns the number of events added.
+    """
+    return _insert_chunked(
+        INSERT_EVENT_SQL,
+        _normalize_rows(events, EVENT_FIELDS),
+        chunk_size,
+        _record_chunk,
+        changes.EVENT_ADDED,
+    )
+
+def queue_trackable_event(trackable_id: int, event_type: str, value: Optional[float] = None, note: Optional[str] = None, data_json: Optional[str] = None, on_error: Optional[Callable[[Exception], None]] = None) -> int:
+    """
+    Record an event without waiting for the database: it is journaled and
+    written in the background. Reads through this module see it right away.
+    If the database later rejects it (e.g. the trackable was deleted), it is
+    dropped and on_error(exception) is called from the writer thread.
+    Returns the queue sequence number, not an event ID.
+    """
+    seq = write_queue.get_queue().enqueue(trackable_id, event_type, value, note, data_json, on_error)
+    invalidate()
+    changes.publish(changes.EVENT_ADDED, [trackable_id])
+    return seq
+
+def iter_trackable_events(trackable_id: int, event_type: Optional[str] = None, after: Optional[Tuple[str, int]] = None, limit: Optional[int] = None, page_size: int = PAGE_SIZE) -> Iterator[TrackableEvent]:
+    """
+    Yield a trackable's events in (created_at, id) order, page_size rows per
+    query, for histories too long to load at once. `after` is the keyset
+    cursor (created_at, id) of the last event seen. Queued events that
+    aren't written yet come last.
+    """
     query = "SELECT * FROM trackable_events WHERE trackable_id = ?"
     params = [trackable_id]
     if event_type:
         query += " AND event_type = ?"
         params.append(event_type)
-    with get_db() as conn:
+    query += " AND (created_at, id) > (?, ?) ORDER BY created_at, id LIMIT ?"
+    yielded = 0
+    while limit is None or yielded < limit:
+        size = page_size if limit is None else min(page_size, limit - yielded)
+        cursor = after if after is not None else ("", 0)
+        with write_queue.visible(), get_db() as conn:
+            db_cursor = conn.cursor()
+            db_cursor.row_factory = event_row
+            rows = db_cursor.execute(query, params + [cursor[0], cursor[1], size]).fetchall()
+            pending = _pending_events(trackable_id) if len(rows) < size else []
+        yield from rows
+        yielded += len(rows)
+        if len(rows) < size:
+            for event in pending:
+                if yielded == limit:
+                    return
+                if not event_type or event.event_type == event_type:
+                    yield event
+                    yielded += 1
+            return
+        after = (rows[-1].created_at, rows[-1].id)
+
+def get_trackable_events(trackable_id: int, event_type: Optional[str] = None) -> List[TrackableEvent]:
+    query = "SELECT * FROM trackable_events WHERE trackable_id = ?"
+    params = [trackable_id]
+    if event_type:
+        query += " AND event_type = ?"
+        params.append(event_type)
+    query += " ORDER BY created_at, id"
+    with write_queue.visible(), get_db() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = event_row
         cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        events = cursor.fetchall()
+        events.extend(
+            event for event in _pending_events(trackable_id)
+            if not event_type or event.event_type == event_type
+        )
+        return events
+
+def _event_range_filters(start: Union[str, date], end: Union[str, date], trackable_ids: Optional[Iterable[int]], event_types: Optional[Iterable[str]]) -> tuple:
+    """WHERE clause and named params for the event range queries."""
+    where = "created_at >= :start AND created_at < :end"
+    params = {"start": _timestamp(start), "end": _timestamp(end)}
+    if trackable_ids is not None:
+        where += " AND trackable_id IN (SELECT value FROM json_each(:ids))"
+        params["ids"] = json.dumps(list(trackable_ids))
+    if event_types is not None:
+        where += " AND event_type IN (SELECT value FROM json_each(:types))"
+        params["types"] = json.dumps(list(event_types))
+    return where, params
+
+def _pending_in_range(params: dict) -> List[TrackableEvent]:
+    """Queued events matching _event_range_filters() params."""
+    ids = set(json.loads(params["ids"])) if "ids" in params else None
+    types = set(json.loads(params["types"])) if "types" in params else None
+    return [
+        event for event in _pending_events()
+        if params["start"] <= event.created_at < params["end"]
+        and (ids is None or event.trackable_id in ids)
+        and (types is None or event.event_type in types)
+    ]
+
+def get_events_in_range(start: Union[str, date], end: Union[str, date], trackable_ids: Optional[Iterable[int]] = None, event_types: Optional[Iterable[str]] = None) -> List[TrackableEvent]:
+    """
+    Events created in [start, end), in (created_at, id) order, optionally
+    only for some trackables and event types. Dates are date/datetime
+    objects or strings in created_at format (UTC).
+    """
+    where, params = _event_range_filters(start, end, trackable_ids, event_types)
+    with write_queue.visible(), get_db() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = event_row
+        cursor.execute(f"SELECT * FROM trackable_events WHERE {where} ORDER BY created_at, id", params)
+        events = cursor.fetchall()
+        events.extend(_pending_in_range(params))
+    return events
+
+def count_events_by_day(start: Union[str, date], end: Union[str, date], trackable_ids: Optional[Iterable[int]] = None, event_types: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    Number of events per day in [start, end), filtered like
+    get_events_in_range(). Returns {'YYYY-MM-DD': count} in day order;
+    days without events are left out. Days are UTC, like created_at.
+    """
+    where, params = _event_range_filters(start, end, trackable_ids, event_types)
+    with write_queue.visible(), get_db() as conn:
+        counts = dict(conn.execute(
+            f"""
+            SELECT date(created_at) AS day, count(*) FROM trackable_events
+            WHERE {where} GROUP BY day ORDER BY day
+            """,
+            params,
+        ).fetchall())
+        for event in _pending_in_range(params):
+            day = event.created_at[:10]
+            counts[day] = counts.get(day, 0) + 1
+    return counts
+
+# --- TRACKABLE STATE ---
+STATUS_EVENT_TYPES = ("completed", "uncompleted")
+
+def _pending_events(trackable_id: Optional[int] = None) -> List[TrackableEvent]:
+    """Queued events that aren't written yet, as models."""
+    return [TrackableEvent(**event) for event in write_queue.pending_events(trackable_id)]
+
+def _apply_pending(state: Union[TrackableState, Trackable], events: List[TrackableEvent]):
+    """Fold queued (not yet written) events into a trackable's state."""
+    for event in events:
+        state.event_count += 1
+        if event.event_type in STATUS_EVENT_TYPES:
+            state.completed = event.event_type == "completed"
+            state.status_at = event.created_at
+        state.last_event_id = event.id
+        state.last_event_type = event.event_type
+        state.last_event_at = event.created_at
+        state.last_value = event.value
+    return state
+
+def _group_by_trackable(events: List[TrackableEvent]) -> Dict[int, List[TrackableEvent]]:
+    grouped = {}
+    for event in events:
+        grouped.setdefault(event.trackable_id, []).append(event)
+    return grouped
+
+def get_trackable_state(trackable_id: int) -> TrackableState:
+    """
+    Current status of a trackable: completion, last event and event count.
+    Read from the trigger-maintained trackable_state table, plus queued events.
+    """
+    with write_queue.visible(), get_db() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = state_row
+        state = cursor.execute(
+            "SELECT * FROM trackable_state WHERE trackable_id = ?", (trackable_id,)
+        ).fetchone() or TrackableState(trackable_id)
+        return _apply_pending(state, _pending_events(trackable_id))
+
+def get_latest_events(trackable_ids: Iterable[int], event_types: Optional[Iterable[str]] = None) -> Dict[int, TrackableEvent]:
+    """
+    Latest event (by created_at, then id) of each trackable, optionally only
+    among `event_types`, in a single query. Returns {trackable_id: event};
+    trackables without a matching event are left out.
+    """
+    trackable_ids = list(trackable_ids)
+    event_types = list(event_types) if event_types is not None else None
+    type_filter = "AND event_type IN (SELECT value FROM json_each(:types))" if event_types is not None else ""
+    with write_queue.visible(), get_db() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = event_row
+        cursor.execute(
+            f"""
+            SELECT e.* FROM json_each(:ids) AS ids
+            JOIN trackable_events AS e ON e.id = (
+                SELECT id FROM trackable_events
+                WHERE trackable_id = ids.value {type_filter}
+                ORDER BY created_at DESC, id DESC LIMIT 1
+            )
+            """,
+            {"ids": json.dumps(trackable_ids), "types": json.dumps(event_types)},
+        )
+        latest = {row.trackable_id: row for row in cursor.fetchall()}
+        wanted = set(trackable_ids)
+        for event in _pending_events():
+            if event.trackable_id in wanted and (event_types is None or event.event_type in event_types):
+                latest[event.trackable_id] = event
+    return latest
+
+# --- DAILY ROLLUPS ---
+def _pending_status() -> Dict[int, bool]:
+    """Completion each trackable will have once its queued events are written."""
+    status = {}
+    for event in _pending_events():
+        if event.event_type in STATUS_EVENT_TYPES:
+            status[event.trackable_id] = event.event_type == "completed"
+    return status
+
+@cached
+def get_daily_rollups(start: Union[str, date], end: Union[str, date], type_: Optional[str] = None, plugin_owner: Optional[str] = None) -> List[DailyRollup]:
+    """
+    Per-day totals of non-archived trackables scheduled (by task_date) in
+    [start, end), one row per (day, type, plugin_owner) in that order.
+    Pre-aggregated by triggers, so a year is a few hundred rows at most.
+    """
+    where, params = _trackable_filters(type_, plugin_owner, None)
+    with write_queue.visible(), get_db() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = rollup_row
+        rollups = cursor.execute(
+            f"""
+            SELECT * FROM daily_rollup WHERE day >= ? AND day < ? AND {where}
+            ORDER BY day, type, plugin_owner
+            """,
+            [_day(start), _day(end)] + params,
+        ).fetchall()
+        status = _pending_status()
+        changed = conn.execute(
+            """
+            SELECT t.id, t.task_date, t.type, t.plugin_owner, t.points, COALESCE(s.completed, 0)
+            FROM trackables AS t
+            LEFT JOIN trackable_state AS s ON s.trackable_id = t.id
+            WHERE t.id IN (SELECT value FROM json_each(?)) AND t.archived_at IS NULL
+            """,
+            (json.dumps(list(status)),),
+        ).fetchall() if status else []
+    groups = {(r.day, r.type, r.plugin_owner): r for r in rollups}
+    for trackable_id, *key, points, completed in changed:
+        group = groups.get(tuple(key))
+        if group is not None and status[trackable_id] != bool(completed):
+            delta = 1 if status[trackable_id] else -1
+            group.completed_count += delta
+            group.points_earned += delta * (points or 0)
+    return rollups
+
+# --- COMPLETION RATES ---
+GRANULARITIES = ("day", "week", "month", "year")
+
+def _bucket(day: date, granularity: str, week_start: int) -> str:
+    """Label of the bucket holding `day`: the day, week's first day, 'YYYY-MM' or 'YYYY'."""
+    if granularity == "week":
+        # isoweekday() % 7 counts from Sunday = 0, like SQLite's weekday
+        day -= timedelta(days=(day.isoweekday() % 7 - week_start) % 7)
+    label = day.isoformat()
+    return label[:{"month": 7, "year": 4}.get(granularity, 10)]
+
+def completion_rate(trackable_ids: Optional[Iterable[int]], granularity: str, start: Union[str, date], end: Union[str, date], type_: Optional[str] = None, plugin_owner: Optional[str] = None, week_start: int = 0) -> CompletionRate:
+    """
+    Completed vs scheduled trackables (by task_date) in [start, end), per
+    day, week, month or year bucket. Every bucket in the range is present,
+    zero when empty; weeks begin on week_start (0 = Sunday ... 6 = Saturday).
+    trackable_ids None covers everything matching type_/plugin_owner and
+    reads the pre-aggregated daily rollup, so multi-year ranges stay cheap;
+    otherwise only the given trackables are counted.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    first, last = (date.fromisoformat(_day(value)) for value in (start, end))
+    result = CompletionRate(granularity)
+    index = {}
+    day = first
+    while day < last:
+        label = _bucket(day, granularity, week_start)
+        if label not in index:
+            index[label] = len(result.buckets)
+            result.buckets.append(label)
+        day += timedelta(days=1)
+    for values in (result.total_count, result.completed_count, result.points_earned, result.points_possible):
+        values.extend([0] * len(result.buckets))
+
+    if trackable_ids is None:
+        rows = [
+            (r.day, r.total_count, r.completed_count, r.points_earned, r.points_possible)
+            for r in get_daily_rollups(first, last, type_, plugin_owner)
+        ]
+    else:
+        where, params = _trackable_filters(type_, plugin_owner, False, alias="t.")
+        with write_queue.visible(), get_db() as conn:
+            scheduled = conn.execute(
+                f"""
+                SELECT t.id, t.task_date, t.points, COALESCE(s.completed, 0)
+                FROM json_each(?) AS ids
+                JOIN trackables AS t ON t.id = ids.value
+                LEFT JOIN trackable_state AS s ON s.trackable_id = t.id
+                WHERE {where} AND t.task_date >= ? AND t.task_date < ?
+                """,
+                [json.dumps(list(trackable_ids))] + params + [first.isoformat(), last.isoformat()],
+            ).fetchall()
+            status = _pending_status()
+        rows = []
+        for trackable_id, task_date, points, completed in scheduled:
+            done = status.get(trackable_id, bool(completed))
+            rows.append((task_date, 1, int(done), (points or 0) * done, points or 0))
+
+    for day, total, completed, earned, possible in rows:
+        try:
+            i = index.get(_bucket(date.fromisoformat(str(day)[:10]), granularity, week_start))
+        except ValueError:
+            # task_date that isn't a date
+            continue
+        if i is not None:
+            result.total_count[i] += total
+            result.completed_count[i] += completed
+            result.points_earned[i] += earned
+            result.points_possible[i] += possible
+    return result
 
 # Optionally, add more API functions as needed.
@@ -0,0 +1,132 @@
+"""
+Notices writes made outside this process, e.g. `keeper` CLI commands run
+while the TUI is open, and publishes them through keeper.api.changes.
+Polling costs one PRAGMA data_version while nothing changes; after a change
+only rows past the last seen ids and archive time are read. data_version
+also moves for this process's other connections (the write queue, the
+async_trackables thread), so trackables this process already published are
+left out.
+"""
+import threading
+from typing import Dict, Set
+
+from keeper.api import changes, write_queue
+from keeper.db.db import get_connection
+
+# Seconds between polls in the TUI
+POLL_INTERVAL = 1.0
+
+LAST_ARCHIVED_SQL = """
+SELECT archived_at FROM trackables WHERE archived_at IS NOT NULL
+ORDER BY archived_at DESC LIMIT 1
+"""
+
+
+class ChangeWatcher:
+    """
+    High-water marks of the changes published so far. data_version is per
+    connection, so create and poll a watcher on one thread. close() it
+    when done.
+    """
+
+    def __init__(self):
+        # Trackables this process published since the last poll, by kind
+        self._published: Dict[str, Set[int]] = {kind: set() for kind in changes.KINDS}
+        self._lock = threading.Lock()
+        # Thread publishing from poll(), whose changes aren't noted
+        self._polling = None
+        changes.subscribe(self._note_published)
+        # Under visible() a queued event is either pending or written, never both
+        with write_queue.visible():
+            conn = get_connection()
+            self.data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            self.last_trackable_id = conn.execute("SELECT COALESCE(max(id), 0) FROM trackables").fetchone()[0]
+            self.last_event_id = conn.execute("SELECT COALESCE(max(id), 0) FROM trackable_events").fetchone()[0]
+            row = conn.execute(LAST_ARCHIVED_SQL).fetchone()
+            self.last_archived_at = row[0] if row else ""
+            # archived_at has one-second resolution: remember who was archived
+            # in the last second seen so a later poll doesn't publish them twice
+            self._archived_at_mark: Set[int] = {
+                row[0] for row in conn.execute(
+                    "SELECT id FROM trackables WHERE archived_at = ?", (self.last_archived_at,)
+                )
+            }
+            # Events still queued are already visible to readers
+            queued = {event["trackable_id"] for event in write_queue.pending_events()}
+        with self._lock:
+            self._published[changes.EVENT_ADDED] |= queued
+
+    def close(self):
+        """Stop noting this process's changes."""
+        changes.unsubscribe(self._note_published)
+
+    def _note_published(self, change: changes.Change):
+        if self._polling == threading.get_ident():
+            return
+        with self._lock:
+            self._published[change.kind].update(change.trackable_ids)
+
+    def poll(self) -> bool:
+        """Publish what other processes wrote since the last poll. Returns True if anything was."""
+        conn = get_connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        with self._lock:
+            published = self._published
+            if version == self.data_version and not any(published.values()):
+                return False
+            # Writes published from now on are noted for the next poll
+            self._published = {kind: set() for kind in changes.KINDS}
+        # Commits on this connection don't move data_version, but still
+        # move the marks past rows already published
+        self.data_version = version
+
+        # Under visible() a queued event is either pending or written, never both
+        with write_queue.visible():
+            created = [row[0] for row in conn.execute(
+                "SELECT id FROM trackables WHERE id > ? ORDER BY id", (self.last_trackable_id,)
+            )]
+            if created:
+                self.last_trackable_id = created[-1]
+
+            events = conn.execute(
+                "SELECT id, trackable_id FROM trackable_events WHERE id > ? ORDER BY id", (self.last_event_id,)
+            ).fetchall()
+            if events:
+                self.last_event_id = events[-1][0]
+
+            # queue_trackable_event() publishes before the write lands, so
+            # keep those trackables until their events are in the database
+            queued = {event["trackable_id"] for event in write_queue.pending_events()}
+        carried = published[changes.EVENT_ADDED] & queued
+        if carried:
+            with self._lock:
+                self._published[changes.EVENT_ADDED] |= carried
+
+        archived = []
+        for trackable_id, archived_at in conn.execute(
+            "SELECT id, archived_at FROM trackables WHERE archived_at >= ? ORDER BY archived_at",
+            (self.last_archived_at,),
+        ):
+            if archived_at == self.last_archived_at and trackable_id in self._archived_at_mark:
+                continue
+            if archived_at != self.last_archived_at:
+                self.last_archived_at = archived_at
+                self._archived_at_mark = set()
+            self._archived_at_mark.add(trackable_id)
+            archived.append(trackable_id)
+
+        found = {
+            changes.TRACKABLE_CREATED: created,
+            changes.EVENT_ADDED: dict.fromkeys(row[1] for row in events),
+            changes.TRACKABLE_ARCHIVED: archived,
+        }
+        external = False
+        self._polling = threading.get_ident()
+        try:
+            for kind, trackable_ids in found.items():
+                trackable_ids = [i for i in trackable_ids if i not in published[kind]]
+                changes.publish(kind, trackable_ids)
+                external = external or bool(trackable_ids)
+        finally:
+            self._polling = None
+        return external
@@ -0,0 +1,345 @@
+"""
+Write-behind queue for trackable events.
+Events are appended to a journal file beside the database and acknowledged
+immediately; a background thread writes them to the database in batches.
+Entries still in the journal after a crash are replayed on the next start,
+and the event_journal table records the last sequence number written so
+nothing is inserted twice. One process at a time owns the journal, holding
+a lock on it while its queue runs; a second process against the same
+database keeps its queued events in memory only.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no lock, each process assumes the journal is its own
+    fcntl = None
+
+from keeper.api.cache import invalidate
+from keeper.db import db
+from keeper.db.db import get_connection, get_db, get_profile_name
+
+# Most events written per transaction
+BATCH_SIZE = 500
+# Seconds to wait for more events before writing a batch
+FLUSH_DELAY = 0.2
+# Seconds before retrying after the database was busy
+RETRY_DELAY = 1.0
+# Failed attempts at a batch before its events are dropped and reported
+MAX_RETRIES = 5
+
+log = logging.getLogger(__name__)
+
+
+def journal_path(db_path: str) -> str:
+    """Journal of the events queued for the database at db_path."""
+    return db_path + "-events.jsonl"
+
+
+class EventWriteQueue:
+    """Journal-backed queue flushed to trackable_events by a background thread."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        # Events only ever go to this database, even if DB_PATH is switched
+        self.db_path = db_path or db.DB_PATH
+        self.journal_path = journal_path(self.db_path)
+        self._cond = threading.Condition()
+        # Held while a batch commits and leaves _pending, so readers never see
+        # an event both in the database and in the queue
+        self._visible = threading.RLock()
+        self._pending: List[dict] = []
+        # seq -> on_error callback of events enqueued in this run
+        self._on_error: Dict[int, Callable[[Exception], None]] = {}
+        self._seq = 0
+        self._written_seq = 0
+        self._flush_target = 0
+        self._stopping = False
+        self._fsync = get_profile_name() == "safe"
+        self._journal = None
+        self._thread = None
+
+    def start(self):
+        """Replay unwritten journal entries and start the flush thread."""
+        self._journal = open(self.journal_path, "a")
+        if self._lock_journal():
+            self._replay()
+        else:
+            # Another process owns the journal, its entries and last_seq
+            log.warning("%s is in use by another process; queued events won't survive a crash",
+                        self.journal_path)
+            self._journal.close()
+            self._journal = None
+        self._thread = threading.Thread(target=self._run, name="keeper-write-queue", daemon=True)
+        self._thread.start()
+
+    def _lock_journal(self) -> bool:
+        """Take the journal until stop(). False if another process has it."""
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _replay(self):
+        last_seq = get_connection().execute(
+            "SELECT last_seq FROM event_journal WHERE id = 1"
+        ).fetchone()[0]
+        self._seq = self._written_seq = last_seq
+        with open(self.journal_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line from a crash mid-write
+                    continue
+                if entry["seq"] > last_seq:
+                    self._pending.append(entry)
+                    self._seq = max(self._seq, entry["seq"])
+
+    def enqueue(self, trackable_id: int, event_type: str, value: Optional[float] = None,
+                note: Optional[str] = None, data_json: Optional[str] = None,
+                on_error: Optional[Callable[[Exception], None]] = None) -> int:
+        """
+        Journal an event for writing and return its sequence number.
+        on_error(exception) is called on the flush thread if the event is
+        dropped because the database rejects it.
+        """
+        with self._cond:
+            self._seq += 1
+            entry = {
+                "seq": self._seq,
+                "trackable_id": trackable_id,
+                "event_type": event_type,
+                "value": value,
+                "note": note,
+                "data_json": data_json,
+                # Same format as datetime('now'), taken when the user acted
+                "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            if self._journal is not None:
+                self._journal.write(json.dumps(entry) + "\n")
+                self._journal.flush()
+                if self._fsync:
+                    os.fsync(self._journal.fileno())
+            self._pending.append(entry)
+            if on_error is not None:
+                self._on_error[entry["seq"]] = on_error
+            self._cond.notify_all()
+            return entry["seq"]
+
+    @contextmanager
+    def visible(self):
+        """Hold while reading the database and pending() for a consistent view."""
+        with self._visible:
+            yield
+
+    def pending(self, trackable_id: Optional[int] = None) -> List[dict]:
+        """Events not yet written, shaped like trackable_events rows."""
+        with self._cond:
+            entries = list(self._pending)
+        return [
+            {
+                "id": None,
+                "trackable_id": e["trackable_id"],
+                "event_type": e["event_type"],
+                "value": e["value"],
+                "note": e["note"],
+                "data_json": e["data_json"],
+                "created_at": e["created_at"],
+            }
+            for e in entries
+            if trackable_id is None or e["trackable_id"] == trackable_id
+        ]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything enqueued so far is written. Returns False on timeout."""
+        with self._cond:
+            target = self._flush_target = self._seq
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written_seq >= target, timeout)
+
+    def stop(self):
+        """Flush remaining events and stop the flush thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self._journal is not None:
+            # Releases the lock
+            self._journal.close()
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stopping)
+                if not self._pending:
+                    return
+                # Let a burst of key presses land in the same batch
+                self._cond.wait_for(
+                    lambda: self._stopping or self._flush_target > self._written_seq,
+                    FLUSH_DELAY,
+                )
+                batch = self._pending[:BATCH_SIZE]
+            if db.DB_PATH != self.db_path:
+                # Another database is current now; the journal keeps these
+                # events for the next start against this one
+                return
+            try:
+                self._write(batch)
+                failures = 0
+            except Exception as error:
+                failures += 1
+                if failures >= MAX_RETRIES:
+                    log.error("Dropping %d queued events after %d failed writes: %s",
+                              len(batch), failures, error)
+                    self._drop(batch, error)
+                    failures = 0
+                    continue
+                with self._cond:
+                    if self._stopping:
+                        # Leave the rest in the journal for the next start
+                        return
+                    self._cond.wait(RETRY_DELAY)
+
+    def _write(self, batch: List[dict]):
+        from keeper.api.streaks import record_events
+        from keeper.api.trackables import INSERT_EVENT_SQL
+
+        rows = [
+            (e["trackable_id"], e["event_type"], e["value"], e["note"], e["data_json"], e["created_at"])
+            for e in batch
+        ]
+        last_seq = batch[-1]["seq"]
+        failed = {}
+        with self._visible:
+            with get_db() as conn:
+                conn.execute("SAVEPOINT write_batch")
+                try:
+                    conn.executemany(INSERT_EVENT_SQL, rows)
+                except sqlite3.IntegrityError:
+                    # e.g. a trackable was deleted meanwhile; keep the rest
+                    conn.execute("ROLLBACK TO write_batch")
+                    for entry, row in zip(batch, rows):
+                        try:
+                            conn.execute(INSERT_EVENT_SQL, row)
+                        except sqlite3.IntegrityError as error:
+                            failed[entry["seq"]] = error
+                record_events(conn, [
+                    (row[0], row[1], row[5]) for entry, row in zip(batch, rows) if entry["seq"] not in failed
+                ])
+                if self._journal is not None:
+                    conn.execute("UPDATE event_journal SET last_seq = ? WHERE id = 1", (last_seq,))
+            with self._cond:
+                del self._pending[:len(batch)]
+                callbacks = [(self._on_error.pop(e["seq"], None), failed.get(e["seq"])) for e in batch]
+            invalidate()
+        # Rejected events have left the pending overlay, so callbacks that
+        # re-read see what the database kept. Runs before flush() returns.
+        for on_error, error in callbacks:
+            if on_error is not None and error is not None:
+                on_error(error)
+        with self._cond:
+            self._written_seq = last_seq
+            if not self._pending and self._journal is not None:
+                # Everything is in the database, start a fresh journal
+                self._journal.seek(0)
+                self._journal.truncate()
+            self._cond.notify_all()
+
+    def _drop(self, batch: List[dict], error: Exception):
+        """Give up on a batch the database keeps refusing, so flush() doesn't wait forever."""
+        with self._visible:
+            with self._cond:
+                del self._pending[:len(batch)]
+                callbacks = [self._on_error.pop(e["seq"], None) for e in batch]
+                if self._journal is not None:
+                    # Rewrite the journal without them so the next start doesn't replay them
+                    self._journal.seek(0)
+                    self._journal.truncate()
+                    for entry in self._pending:
+                        self._journal.write(json.dumps(entry) + "\n")
+                    self._journal.flush()
+            invalidate()
+        for on_error in callbacks:
+            if on_error is not None:
+                on_error(error)
+        with self._cond:
+            self._written_seq = batch[-1]["seq"]
+            self._cond.notify_all()
+
+
+_queue: Optional[EventWriteQueue] = None
+_queue_lock = threading.Lock()
+
+
+def _current() -> Optional[EventWriteQueue]:
+    """The running queue, if it belongs to the database at DB_PATH."""
+    queue = _queue
+    return queue if queue is not None and queue.db_path == db.DB_PATH else None
+
+
+def get_queue() -> EventWriteQueue:
+    """Return the queue of the database at DB_PATH, starting it on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is not None and _queue.db_path != db.DB_PATH:
+            # DB_PATH was switched: leave the old database's events in its journal
+            _queue.stop()
+            _queue = None
+        if _queue is None:
+            queue = EventWriteQueue()
+            queue.start()
+            _queue = queue
+        return _queue
+
+
+def recover():
+    """Start the queue if a previous run left unwritten events in the journal."""
+    path = journal_path(db.DB_PATH)
+    if os.path.exists(path) and os.path.getsize(path):
+        get_queue()
+
+
+@contextmanager
+def visible():
+    """Consistent view of database reads plus pending events (no-op when idle)."""
+    queue = _current()
+    if queue is None:
+        yield
+    else:
+        with queue.visible():
+            yield
+
+
+def pending_events(trackable_id: Optional[int] = None) -> List[dict]:
+    """Queued events that aren't in the database yet."""
+    queue = _current()
+    return queue.pending(trackable_id) if queue is not None else []
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """Write all queued events now."""
+    queue = _current()
+    return queue.flush(timeout) if queue is not None else True
+
+
+@atexit.register
+def shutdown():
+    """Flush and stop the queue; called on app exit."""
+    global _queue
+    with _queue_lock:
+        queue, _queue = _queue, None
+    if queue is not None:
+        queue.stop()
@@ -2,6 +2,7 @@ import importlib
 import os
 from typer import Typer
 from keeper.constants import PLUGINS_DIR
+from keeper.commands import db
 from rich import console
 
 
@@ -11,6 +12,9 @@ def import_commands_from_plugins(app: Typer):
     """
     # see if no plugins exist, if so, raise an error
 
+    # Core command groups
+    app.add_typer(db.app, name="db")
+
     for plugin in os.listdir(PLUGINS_DIR):
         plugin_path = os.path.join(PLUGINS_DIR, plugin)
         command_file = os.path.join(plugin_path, "command.py")
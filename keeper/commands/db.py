@@ -0,0 +1,39 @@
+"""
+Database maintenance commands for Keeper.
+Provides: db info, db migrate, db rebuild-rollups
+"""
+import typer
+from rich import print
+from keeper.constants import DB_PROFILES
+from keeper.db.db import get_db_info, rebuild_daily_rollups
+from keeper.db.migrations import run_backfills, run_migrations
+
+app = typer.Typer(help="Inspect and maintain the Keeper database.")
+
+@app.command("info")
+def info():
+    """Show the database location and the active connection profile."""
+    details = get_db_info()
+    print(f"[bold]Database:[/bold] {details.pop('path')}")
+    print(f"[bold]Profile:[/bold] {details.pop('profile')} "
+          f"(available: {', '.join(DB_PROFILES)})")
+    for pragma, value in details.items():
+        print(f"  {pragma}: {value}")
+
+@app.command("migrate")
+def migrate():
+    """Apply pending schema migrations and run their backfills to completion."""
+    applied = run_migrations()
+    for label in applied:
+        print(f"[green]Applied {label}[/green]")
+    chunks = run_backfills()
+    if chunks:
+        print(f"[green]Backfilled {chunks} chunk(s)[/green]")
+    if not applied and not chunks:
+        print("[yellow]Schema is up to date.[/yellow]")
+
+@app.command("rebuild-rollups")
+def rebuild_rollups():
+    """Recount the daily points rollup from all trackables."""
+    rebuild_daily_rollups()
+    print("[green]Daily rollups rebuilt.[/green]")
@@ -20,6 +20,7 @@ class AuthHandler:
 
         # Ensure config.json exists
         if not os.path.exists(CONFIG_PATH):
+            os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
             write_json(CONFIG_PATH, {})
 
         # Initialize database schema
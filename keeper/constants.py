@@ -18,6 +18,39 @@ DB_PATH = os.path.join(APP_DIR, "keeper.db")
 EVENT_IDS_CACHE_PATH = os.path.join(APP_DIR, "event_ids_cache.json")
 PLUGINS_DIR = os.path.join(os.path.dirname(__file__), "commands")
 
+# SQLite connection profiles, selected with "db_profile" in the config file.
+# Every profile uses WAL so readers never block the writer.
+DB_PROFILES = {
+    # fsync on every commit, nothing lost even on power failure
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,  # negative means KiB
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,  # milliseconds
+    },
+    # fsync only at checkpoints, a power failure may lose the last commits
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 64 * 1024 * 1024,
+        "cache_size": -8000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # no fsync at all, an OS crash may corrupt recent commits
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -32000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+DEFAULT_DB_PROFILE = "balanced"
+
 
 # Commands
 class CommandName(str, Enum):
@@ -2,79 +2,177 @@
 SQLite database management for Keeper.
 Handles connection, schema creation, and core database operations.
 """
+import atexit
 import os
 import sqlite3
+import threading
 from contextlib import contextmanager
-from typing import Optional
+from typing import Callable, List, Optional
 
-from keeper.constants import APP_DIR
+from keeper.constants import APP_DIR, CONFIG_PATH, DB_PROFILES, DEFAULT_DB_PROFILE
+from keeper.utils.json_utils import read_json
 
 # Database file path
 DB_PATH = os.path.join(APP_DIR, "keeper.db")
 
+# Backfill chunks run synchronously by init_database() after migrating
+STARTUP_BACKFILL_CHUNKS = 4
 
-def get_connection() -> sqlite3.Connection:
-    """Get a database connection with row factory for dict-like access."""
+# Warm connections, one per thread. sqlite3 connections may only be used by
+# the thread that created them, so each thread keeps its own and reuses it
+# (and its statement cache) across calls. A thread's connection is released
+# together with the thread.
+_local = threading.local()
+
+# Called after get_db() commits a transaction that changed rows, whichever
+# module wrote them (e.g. keeper.api.cache empties itself)
+_write_hooks: List[Callable[[], None]] = []
+
+
+def on_write(hook: Callable[[], None]) -> Callable[[], None]:
+    """Call hook() after every get_db() transaction that changed rows. Returns hook."""
+    _write_hooks.append(hook)
+    return hook
+
+
+def get_profile_name() -> str:
+    """Return the configured connection profile, falling back to the default."""
+    try:
+        name = read_json(CONFIG_PATH).get("db_profile", DEFAULT_DB_PROFILE)
+    except (OSError, ValueError):
+        name = DEFAULT_DB_PROFILE
+    return name if name in DB_PROFILES else DEFAULT_DB_PROFILE
+
+
+def _open_connection() -> sqlite3.Connection:
+    """Open and configure a new database connection."""
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
+    # REPLACE fires delete triggers too, which daily_rollup relies on
+    conn.execute("PRAGMA recursive_triggers = ON")
+    for pragma, value in DB_PROFILES[get_profile_name()].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
     return conn
 
 
+def get_connection() -> sqlite3.Connection:
+    """Get this thread's warm database connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_PATH:
+        return conn
+    if conn is not None:
+        # DB_PATH changed since this connection was opened
+        conn.close()
+    conn = _open_connection()
+    _local.conn = conn
+    _local.path = DB_PATH
+    _local.depth = 0
+    return conn
+
+
+@atexit.register
+def close_connection():
+    """Close the current thread's connection, if it has one."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
+
+
+# PRAGMAs that report a number for a named setting
+_PRAGMA_NAMES = {
+    "synchronous": ["OFF", "NORMAL", "FULL", "EXTRA"],
+    "temp_store": ["DEFAULT", "FILE", "MEMORY"],
+}
+
+
+def get_db_info() -> dict:
+    """Return the database path, active profile and effective PRAGMA values."""
+    conn = get_connection()
+    info = {"path": DB_PATH, "profile": get_profile_name()}
+    for pragma in DB_PROFILES[info["profile"]]:
+        value = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+        if pragma in _PRAGMA_NAMES:
+            value = _PRAGMA_NAMES[pragma][value]
+        info[pragma] = value
+    return info
+
+
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
+    """
+    Context manager for database access on the thread's warm connection.
+    Commits on success and rolls back on error. Nested uses join the
+    outermost transaction instead of committing early. A commit that
+    changed rows runs the on_write() hooks.
+    """
     conn = get_connection()
+    _local.depth += 1
+    changes_before = conn.total_changes
     try:
         yield conn
-        conn.commit()
+        if _local.depth == 1:
+            conn.commit()
+            if conn.total_changes != changes_before:
+                for hook in _write_hooks:
+                    hook()
     except Exception:
-        conn.rollback()
+        if _local.depth == 1:
+            conn.rollback()
         raise
     finally:
-        conn.close()
+        _local.depth -= 1
+
+
+def get_schema_version() -> int:
+    """Return the schema version recorded in the database."""
+    return get_connection().execute("PRAGMA user_version").fetchone()[0]
 
 
 def init_database():
-    """Initialize the database schema if it doesn't exist."""
+    """
+    Bring the core and plugin schemas up to date.
+    PRAGMA user_version holds a fingerprint of every known migration, so an
+    up-to-date database costs a single read and no DDL.
+    """
+    from .migrations import discover_migrations, fingerprint, run_backfills, run_migrations
+
+    migrations = discover_migrations()
+    # Fast path: a single PRAGMA read on an up-to-date database
+    if os.path.exists(DB_PATH) and get_schema_version() == fingerprint(migrations):
+        return
+
     # Ensure app directory exists
     if not os.path.isdir(APP_DIR):
         os.makedirs(APP_DIR)
 
-    from .schema import (
-        CREATE_TABLE_TRACKABLES,
-        CREATE_TABLE_TRACKABLE_EVENTS,
-        CREATE_INDEX_EVENTS_TRACKABLE,
-        CREATE_INDEX_EVENTS_CREATED_AT,
-        CREATE_INDEX_TRACKABLES_PLUGIN,
-    )
-    with get_db() as conn:
-        cursor = conn.cursor()
+    run_migrations(migrations)
+    # Small databases finish their backfills before the first query;
+    # larger ones continue in the background (see KeeperApp.on_mount)
+    run_backfills(migrations, max_chunks=STARTUP_BACKFILL_CHUNKS)
 
-        # Trackables and events tables
-        cursor.execute(CREATE_TABLE_TRACKABLES)
-        cursor.execute(CREATE_TABLE_TRACKABLE_EVENTS)
-        cursor.execute(CREATE_INDEX_EVENTS_TRACKABLE)
-        cursor.execute(CREATE_INDEX_EVENTS_CREATED_AT)
-        cursor.execute(CREATE_INDEX_TRACKABLES_PLUGIN)
-        conn.commit()
 
-import importlib
+def rebuild_daily_rollups():
+    """Recount daily_rollup from scratch (its triggers keep it current otherwise)."""
+    from .schema import REBUILD_DAILY_ROLLUP
+
+    with get_db() as conn:
+        for sql in REBUILD_DAILY_ROLLUP:
+            conn.execute(sql)
+
 
 def run_plugin_migrations(plugin_name: str, action: str):
     """
-    Run 'create_tables' or 'drop_tables' for a plugin.
+    Apply a plugin's pending migrations or drop its tables.
     action: 'create' or 'drop'
     """
-    try:
-        migrations = importlib.import_module(f"plugins.{plugin_name}.migrations")
-    except ModuleNotFoundError:
-        raise Exception(f"No migrations found for plugin '{plugin_name}'")
-    with get_db() as conn:
-        if action == "create":
-            migrations.create_tables(conn)
-        elif action == "drop":
-            migrations.drop_tables(conn)
-        else:
-            raise ValueError("action must be 'create' or 'drop'")
-            
\ No newline at end of file
+    from .migrations import drop_plugin, import_plugin_migrations, run_migrations
+
+    if action == "create":
+        import_plugin_migrations(plugin_name)
+        run_migrations()
+    elif action == "drop":
+        drop_plugin(plugin_name)
+    else:
+        raise ValueError("action must be 'create' or 'drop'")
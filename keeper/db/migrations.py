@@ -0,0 +1,271 @@
+"""
+Versioned schema migrations for Keeper.
+Core steps live in keeper.db.schema.MIGRATIONS and each plugin may ship a
+migrations.py with its own MIGRATIONS list. Applied versions and their
+checksums are recorded in the schema_migrations table.
+"""
+import hashlib
+import importlib
+import inspect
+import os
+import sqlite3
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional
+
+from keeper.db.db import get_connection, get_db
+
+CORE_COMPONENT = "core"
+
+# keeper/plugins, where plugin migrations.py files are discovered
+PLUGINS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "plugins")
+
+CREATE_TABLE_SCHEMA_MIGRATIONS = '''
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    component TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at DATETIME NOT NULL DEFAULT (datetime('now')),
+    backfill_position INTEGER,
+    PRIMARY KEY (component, version)
+);
+'''
+
+
+class MigrationError(Exception):
+    """Raised when recorded migrations do not match the code."""
+
+
+class Backfill:
+    """
+    A data update that runs after its migration commits, in chunks of
+    chunk_size rows of `table`, one short transaction per chunk, so large
+    tables are rewritten without holding the write lock for long.
+
+    `sql` is executed once per chunk with :start and :end bound to the
+    rowid window (start, end] of `table`, e.g.
+        UPDATE trackable_events SET x = ... WHERE id > :start AND id <= :end
+    """
+
+    def __init__(self, table: str, sql: str, chunk_size: int = 1000):
+        self.table = table
+        self.sql = sql
+        self.chunk_size = chunk_size
+
+    def run_chunk(self, conn: sqlite3.Connection, start: int) -> Optional[int]:
+        """Run one chunk after rowid `start`; return the new position or None when done."""
+        row = conn.execute(
+            f"SELECT max(rowid) FROM (SELECT rowid FROM {self.table} "
+            f"WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+            (start, self.chunk_size),
+        ).fetchone()
+        end = row[0]
+        if end is None:
+            return None
+        conn.execute(self.sql, {"start": start, "end": end})
+        return end
+
+
+class Migration:
+    """
+    A single versioned schema change.
+    `statements` are SQL strings run in order; `apply` is an optional
+    callable taking the connection for changes SQL alone can't express.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        name: str,
+        statements: Iterable[str] = (),
+        apply: Optional[Callable[[sqlite3.Connection], None]] = None,
+        backfill: Optional[Backfill] = None,
+    ):
+        self.version = version
+        self.name = name
+        self.statements = list(statements)
+        self.apply = apply
+        self.backfill = backfill
+
+    @property
+    def checksum(self) -> str:
+        """Hash of everything the step executes, to detect edited migrations."""
+        digest = hashlib.sha256()
+        for sql in self.statements:
+            digest.update(sql.strip().encode())
+        if self.apply is not None:
+            digest.update(inspect.getsource(self.apply).encode())
+        if self.backfill is not None:
+            digest.update(self.backfill.sql.strip().encode())
+        return digest.hexdigest()
+
+    def run(self, conn: sqlite3.Connection):
+        for sql in self.statements:
+            conn.execute(sql)
+        if self.apply is not None:
+            self.apply(conn)
+
+
+def _load_plugin_migrations(module) -> List[Migration]:
+    """Read MIGRATIONS from a plugin module, wrapping legacy create_tables()."""
+    if hasattr(module, "MIGRATIONS"):
+        return list(module.MIGRATIONS)
+    if hasattr(module, "create_tables"):
+        return [Migration(1, "create_tables", apply=module.create_tables)]
+    return []
+
+
+def import_plugin_migrations(plugin_name: str):
+    """Import keeper.plugins.<plugin_name>.migrations."""
+    try:
+        return importlib.import_module(f"keeper.plugins.{plugin_name}.migrations")
+    except ModuleNotFoundError:
+        raise MigrationError(f"No migrations found for plugin '{plugin_name}'")
+
+
+def discover_migrations() -> Dict[str, List[Migration]]:
+    """Return migrations for core and every plugin that ships migrations.py."""
+    from keeper.db.schema import MIGRATIONS
+
+    found = {CORE_COMPONENT: list(MIGRATIONS)}
+    if os.path.isdir(PLUGINS_DIR):
+        for plugin in sorted(os.listdir(PLUGINS_DIR)):
+            if plugin.startswith("__"):
+                continue
+            if os.path.exists(os.path.join(PLUGINS_DIR, plugin, "migrations.py")):
+                steps = _load_plugin_migrations(import_plugin_migrations(plugin))
+                if steps:
+                    found[plugin] = steps
+    for component, steps in found.items():
+        steps.sort(key=lambda m: m.version)
+        versions = [m.version for m in steps]
+        if len(set(versions)) != len(versions):
+            raise MigrationError(f"Duplicate migration versions in '{component}'")
+    return found
+
+
+def fingerprint(migrations: Dict[str, List[Migration]]) -> int:
+    """
+    Positive 31-bit number identifying the full set of known migrations.
+    Stored in PRAGMA user_version so startup can tell with one read whether
+    anything is pending.
+    """
+    key = ";".join(
+        f"{component}:{m.version}:{m.checksum}"
+        for component in sorted(migrations)
+        for m in migrations[component]
+    )
+    return zlib.crc32(key.encode()) & 0x7FFFFFFF or 1
+
+
+def _applied(conn: sqlite3.Connection, component: str) -> Dict[int, str]:
+    rows = conn.execute(
+        "SELECT version, checksum FROM schema_migrations WHERE component = ?",
+        (component,),
+    ).fetchall()
+    return {row["version"]: row["checksum"] for row in rows}
+
+
+def run_migrations(migrations: Optional[Dict[str, List[Migration]]] = None) -> List[str]:
+    """
+    Apply every pending migration in a single transaction and stamp the
+    fingerprint into PRAGMA user_version. Backfills are only scheduled here;
+    run them with run_backfills(). Returns "component:version" labels applied.
+    """
+    if migrations is None:
+        migrations = discover_migrations()
+    applied_now = []
+    with get_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(CREATE_TABLE_SCHEMA_MIGRATIONS)
+        for component, steps in migrations.items():
+            applied = _applied(conn, component)
+            for migration in steps:
+                if migration.version in applied:
+                    if applied[migration.version] != migration.checksum:
+                        raise MigrationError(
+                            f"Migration {component}:{migration.version} "
+                            f"'{migration.name}' was changed after being applied"
+                        )
+                    continue
+                migration.run(conn)
+                conn.execute(
+                    """
+                    INSERT INTO schema_migrations (component, version, name, checksum, backfill_position)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (
+                        component,
+                        migration.version,
+                        migration.name,
+                        migration.checksum,
+                        0 if migration.backfill is not None else None,
+                    ),
+                )
+                applied_now.append(f"{component}:{migration.version}")
+        conn.execute(f"PRAGMA user_version = {fingerprint(migrations)}")
+    return applied_now
+
+
+def pending_backfills() -> int:
+    """Number of migrations whose backfill hasn't finished."""
+    row = get_connection().execute(
+        "SELECT count(*) FROM schema_migrations WHERE backfill_position IS NOT NULL"
+    ).fetchone()
+    return row[0]
+
+
+def run_backfills(
+    migrations: Optional[Dict[str, List[Migration]]] = None,
+    max_chunks: Optional[int] = None,
+) -> int:
+    """
+    Advance pending backfills one chunk per transaction, resuming from the
+    recorded position. Stops after max_chunks chunks if given. Returns the
+    number of chunks run.
+    """
+    if migrations is None:
+        migrations = discover_migrations()
+    by_key = {
+        (component, m.version): m
+        for component, steps in migrations.items()
+        for m in steps
+    }
+    rows = get_connection().execute(
+        """
+        SELECT component, version, backfill_position FROM schema_migrations
+        WHERE backfill_position IS NOT NULL ORDER BY component, version
+        """
+    ).fetchall()
+    chunks = 0
+    for row in rows:
+        migration = by_key.get((row["component"], row["version"]))
+        position = row["backfill_position"]
+        while position is not None:
+            if max_chunks is not None and chunks >= max_chunks:
+                return chunks
+            with get_db() as conn:
+                if migration is None or migration.backfill is None:
+                    position = None
+                else:
+                    position = migration.backfill.run_chunk(conn, position)
+                conn.execute(
+                    """
+                    UPDATE schema_migrations SET backfill_position = ?
+                    WHERE component = ? AND version = ?
+                    """,
+                    (position, row["component"], row["version"]),
+                )
+            chunks += 1
+    return chunks
+
+
+def drop_plugin(plugin_name: str):
+    """Run a plugin's drop_tables() and forget its applied migrations."""
+    module = import_plugin_migrations(plugin_name)
+    with get_db() as conn:
+        if hasattr(module, "drop_tables"):
+            module.drop_tables(conn)
+        conn.execute("DELETE FROM schema_migrations WHERE component = ?", (plugin_name,))
+        # Force the next startup to re-check migrations
+        conn.execute("PRAGMA user_version = 0")
@@ -1,4 +1,5 @@
 # SQLite schema for Keeper trackables and events
+from keeper.db.migrations import Backfill, Migration
 
 CREATE_TABLE_TRACKABLES = '''
 CREATE TABLE IF NOT EXISTS trackables (
@@ -39,3 +40,356 @@ CREATE INDEX IF NOT EXISTS idx_events_created_at ON trackable_events(created_at)
 CREATE_INDEX_TRACKABLES_PLUGIN = '''
 CREATE INDEX IF NOT EXISTS idx_trackables_plugin ON trackables(plugin_owner);
 '''
+
+# Last write-behind queue entry written to trackable_events, updated in the
+# same transaction as the events so journal replay never duplicates them
+CREATE_TABLE_EVENT_JOURNAL = '''
+CREATE TABLE IF NOT EXISTS event_journal (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_seq INTEGER NOT NULL
+);
+'''
+
+INIT_EVENT_JOURNAL = '''
+INSERT OR IGNORE INTO event_journal (id, last_seq) VALUES (1, 0);
+'''
+
+# Indexes for the real access paths. Every secondary index ends with the
+# implicit rowid, so (trackable_id, created_at) also yields events in
+# (created_at, id) order without a sort.
+CREATE_INDEX_EVENTS_TRACKABLE_CREATED = '''
+CREATE INDEX IF NOT EXISTS idx_events_trackable_created ON trackable_events(trackable_id, created_at);
+'''
+
+CREATE_INDEX_EVENTS_TRACKABLE_TYPE_CREATED = '''
+CREATE INDEX IF NOT EXISTS idx_events_trackable_type_created ON trackable_events(trackable_id, event_type, created_at);
+'''
+
+CREATE_INDEX_EVENTS_CREATED_TRACKABLE = '''
+CREATE INDEX IF NOT EXISTS idx_events_created_trackable ON trackable_events(created_at, trackable_id);
+'''
+
+CREATE_INDEX_TRACKABLES_TYPE_ARCHIVED = '''
+CREATE INDEX IF NOT EXISTS idx_trackables_type_archived ON trackables(type, archived_at);
+'''
+
+# Day a trackable is scheduled for: config_json's task_date, else the day it
+# was created. Virtual (ALTER TABLE can't add stored columns); the index
+# below stores it.
+ADD_COLUMN_TASK_DATE = '''
+ALTER TABLE trackables ADD COLUMN task_date TEXT GENERATED ALWAYS AS (
+    COALESCE(
+        CASE WHEN json_valid(config_json) THEN json_extract(config_json, '$.task_date') END,
+        substr(created_at, 1, 10)
+    )
+) VIRTUAL;
+'''
+
+CREATE_INDEX_TRACKABLES_TYPE_TASK_DATE = '''
+CREATE INDEX IF NOT EXISTS idx_trackables_type_task_date ON trackables(type, task_date);
+'''
+
+# Current status of each trackable, kept up to date by triggers on
+# trackable_events so views don't have to scan event history.
+# completed/status_at come from the latest 'completed' or 'uncompleted'
+# event, last_* from the latest event of any type.
+CREATE_TABLE_TRACKABLE_STATE = '''
+CREATE TABLE IF NOT EXISTS trackable_state (
+    trackable_id INTEGER PRIMARY KEY,
+    completed INTEGER NOT NULL DEFAULT 0,
+    status_at DATETIME,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    last_event_id INTEGER,
+    last_event_type TEXT,
+    last_event_at DATETIME,
+    last_value REAL,
+    FOREIGN KEY (trackable_id) REFERENCES trackables(id) ON DELETE CASCADE
+);
+'''
+
+# "Latest" orders by (created_at, id), so backdated events don't win
+CREATE_TRIGGER_STATE_INSERT = '''
+CREATE TRIGGER IF NOT EXISTS trg_trackable_state_insert
+AFTER INSERT ON trackable_events
+BEGIN
+    INSERT INTO trackable_state (trackable_id, completed, status_at, event_count,
+                                 last_event_id, last_event_type, last_event_at, last_value)
+    VALUES (NEW.trackable_id,
+            NEW.event_type = 'completed',
+            CASE WHEN NEW.event_type IN ('completed', 'uncompleted') THEN NEW.created_at END,
+            1, NEW.id, NEW.event_type, NEW.created_at, NEW.value)
+    ON CONFLICT (trackable_id) DO UPDATE SET
+        event_count = event_count + 1,
+        completed = CASE WHEN excluded.status_at >= COALESCE(status_at, '')
+                         THEN excluded.completed ELSE completed END,
+        status_at = CASE WHEN excluded.status_at >= COALESCE(status_at, '')
+                         THEN excluded.status_at ELSE status_at END,
+        last_event_id = CASE WHEN excluded.last_event_at >= last_event_at
+                             THEN excluded.last_event_id ELSE last_event_id END,
+        last_event_type = CASE WHEN excluded.last_event_at >= last_event_at
+                               THEN excluded.last_event_type ELSE last_event_type END,
+        last_value = CASE WHEN excluded.last_event_at >= last_event_at
+                          THEN excluded.last_value ELSE last_value END,
+        last_event_at = MAX(last_event_at, excluded.last_event_at);
+END;
+'''
+
+# Rebuilds trackable_state rows from the events matching {where}
+RECOMPUTE_TRACKABLE_STATE = '''
+INSERT OR REPLACE INTO trackable_state (trackable_id, completed, status_at, event_count,
+                                        last_event_id, last_event_type, last_event_at, last_value)
+SELECT g.trackable_id, COALESCE(s.event_type = 'completed', 0), s.created_at, g.event_count,
+       l.id, l.event_type, l.created_at, l.value
+FROM (SELECT trackable_id, count(*) AS event_count FROM trackable_events
+      WHERE {where} GROUP BY trackable_id) AS g
+JOIN trackable_events AS l ON l.id = (
+    SELECT id FROM trackable_events WHERE trackable_id = g.trackable_id
+    ORDER BY created_at DESC, id DESC LIMIT 1)
+LEFT JOIN trackable_events AS s ON s.id = (
+    SELECT id FROM trackable_events WHERE trackable_id = g.trackable_id
+    AND event_type IN ('completed', 'uncompleted')
+    ORDER BY created_at DESC, id DESC LIMIT 1);
+'''
+
+CREATE_TRIGGER_STATE_DELETE = '''
+CREATE TRIGGER IF NOT EXISTS trg_trackable_state_delete
+AFTER DELETE ON trackable_events
+BEGIN
+    DELETE FROM trackable_state WHERE trackable_id = OLD.trackable_id;
+    {recompute}
+END;
+'''.format(recompute=RECOMPUTE_TRACKABLE_STATE.format(where="trackable_id = OLD.trackable_id"))
+
+CREATE_TRIGGER_STATE_UPDATE = '''
+CREATE TRIGGER IF NOT EXISTS trg_trackable_state_update
+AFTER UPDATE ON trackable_events
+BEGIN
+    DELETE FROM trackable_state WHERE trackable_id IN (OLD.trackable_id, NEW.trackable_id);
+    {recompute}
+END;
+'''.format(recompute=RECOMPUTE_TRACKABLE_STATE.format(
+    where="trackable_id IN (OLD.trackable_id, NEW.trackable_id)"))
+
+# Per-day totals of non-archived trackables, grouped by the day they are
+# scheduled for (task_date). Kept current by the triggers below.
+CREATE_TABLE_DAILY_ROLLUP = '''
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT NOT NULL,
+    type TEXT NOT NULL,
+    plugin_owner TEXT NOT NULL,
+    total_count INTEGER NOT NULL,
+    completed_count INTEGER NOT NULL,
+    points_earned INTEGER NOT NULL,
+    points_possible INTEGER NOT NULL,
+    PRIMARY KEY (day, type, plugin_owner)
+) WITHOUT ROWID;
+'''
+
+# Adds one trackable's share to its group: {total} trackables and {done}
+# completions (negative to subtract). O(1), used on every event write.
+ROLLUP_DELTA = '''
+INSERT INTO daily_rollup (day, type, plugin_owner, total_count, completed_count,
+                          points_earned, points_possible)
+SELECT task_date, type, plugin_owner, {total}, {done},
+       ({done}) * COALESCE(points, 0), ({total}) * COALESCE(points, 0)
+FROM trackables WHERE id = {trackable_id} AND archived_at IS NULL
+ON CONFLICT (day, type, plugin_owner) DO UPDATE SET
+    total_count = total_count + excluded.total_count,
+    completed_count = completed_count + excluded.completed_count,
+    points_earned = points_earned + excluded.points_earned,
+    points_possible = points_possible + excluded.points_possible;
+'''
+
+# Recounts the (day, type, plugin_owner) group of trigger row {row}. Used
+# for the rare edits that move a trackable between groups or delete it,
+# where recounting is simpler than tracking what it used to contribute.
+RECOMPUTE_DAILY_ROLLUP = '''
+DELETE FROM daily_rollup
+WHERE day = {row}.task_date AND type = {row}.type AND plugin_owner = {row}.plugin_owner;
+INSERT INTO daily_rollup (day, type, plugin_owner, total_count, completed_count,
+                          points_earned, points_possible)
+SELECT t.task_date, t.type, t.plugin_owner, count(*), sum(COALESCE(s.completed, 0)),
+       sum(CASE WHEN s.completed THEN COALESCE(t.points, 0) ELSE 0 END),
+       sum(COALESCE(t.points, 0))
+FROM trackables AS t
+LEFT JOIN trackable_state AS s ON s.trackable_id = t.id
+WHERE t.type = {row}.type AND t.task_date = {row}.task_date
+  AND t.plugin_owner = {row}.plugin_owner AND t.archived_at IS NULL
+GROUP BY t.task_date, t.type, t.plugin_owner;
+'''
+
+CREATE_TRIGGER_ROLLUP_TRACKABLE_INSERT = '''
+CREATE TRIGGER IF NOT EXISTS trg_daily_rollup_trackable_insert
+AFTER INSERT ON trackables
+BEGIN
+    {delta}
+END;
+'''.format(delta=ROLLUP_DELTA.format(
+    total=1,
+    done="COALESCE((SELECT completed FROM trackable_state WHERE trackable_id = NEW.id), 0)",
+    trackable_id="NEW.id",
+))
+
+CREATE_TRIGGER_ROLLUP_TRACKABLE_UPDATE = '''
+CREATE TRIGGER IF NOT EXISTS trg_daily_rollup_trackable_update
+AFTER UPDATE OF type, plugin_owner, points, config_json, created_at, archived_at ON trackables
+BEGIN
+    {old}
+    {new}
+END;
+'''.format(old=RECOMPUTE_DAILY_ROLLUP.format(row="OLD"), new=RECOMPUTE_DAILY_ROLLUP.format(row="NEW"))
+
+CREATE_TRIGGER_ROLLUP_TRACKABLE_DELETE = '''
+CREATE TRIGGER IF NOT EXISTS trg_daily_rollup_trackable_delete
+AFTER DELETE ON trackables
+BEGIN
+    {recompute}
+END;
+'''.format(recompute=RECOMPUTE_DAILY_ROLLUP.format(row="OLD"))
+
+# Completion changes arrive through trackable_state. The INSERT OR REPLACE
+# in RECOMPUTE_TRACKABLE_STATE relies on recursive_triggers (set on every
+# connection) so a replaced row fires the delete trigger first.
+CREATE_TRIGGER_ROLLUP_STATE_INSERT = '''
+CREATE TRIGGER IF NOT EXISTS trg_daily_rollup_state_insert
+AFTER INSERT ON trackable_state WHEN NEW.completed
+BEGIN
+    {delta}
+END;
+'''.format(delta=ROLLUP_DELTA.format(total=0, done=1, trackable_id="NEW.trackable_id"))
+
+CREATE_TRIGGER_ROLLUP_STATE_UPDATE = '''
+CREATE TRIGGER IF NOT EXISTS trg_daily_rollup_state_update
+AFTER UPDATE OF completed ON trackable_state WHEN OLD.completed IS NOT NEW.completed
+BEGIN
+    {delta}
+END;
+'''.format(delta=ROLLUP_DELTA.format(
+    total=0, done="NEW.completed - OLD.completed", trackable_id="NEW.trackable_id"
+))
+
+CREATE_TRIGGER_ROLLUP_STATE_DELETE = '''
+CREATE TRIGGER IF NOT EXISTS trg_daily_rollup_state_delete
+AFTER DELETE ON trackable_state WHEN OLD.completed
+BEGIN
+    {delta}
+END;
+'''.format(delta=ROLLUP_DELTA.format(total=0, done=-1, trackable_id="OLD.trackable_id"))
+
+# Full rebuild, for the migration and `keeper db rebuild-rollups`
+REBUILD_DAILY_ROLLUP = [
+    "DELETE FROM daily_rollup;",
+    '''
+    INSERT INTO daily_rollup (day, type, plugin_owner, total_count, completed_count,
+                              points_earned, points_possible)
+    SELECT t.task_date, t.type, t.plugin_owner, count(*), sum(COALESCE(s.completed, 0)),
+           sum(CASE WHEN s.completed THEN COALESCE(t.points, 0) ELSE 0 END),
+           sum(COALESCE(t.points, 0))
+    FROM trackables AS t
+    LEFT JOIN trackable_state AS s ON s.trackable_id = t.id
+    WHERE t.archived_at IS NULL
+    GROUP BY t.task_date, t.type, t.plugin_owner;
+    ''',
+]
+
+# Cached streak of each trackable, maintained by keeper.api.streaks
+CREATE_TABLE_TRACKABLE_STREAKS = '''
+CREATE TABLE IF NOT EXISTS trackable_streaks (
+    trackable_id INTEGER PRIMARY KEY,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_counted_day TEXT,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (trackable_id) REFERENCES trackables(id) ON DELETE CASCADE
+);
+'''
+
+# Edited or deleted events and changed repeat rules invalidate the cached
+# streak; it is recomputed on the next read
+CREATE_TRIGGER_STREAKS_EVENT_UPDATE = '''
+CREATE TRIGGER IF NOT EXISTS trg_trackable_streaks_event_update
+AFTER UPDATE OF trackable_id, event_type, created_at ON trackable_events
+BEGIN
+    DELETE FROM trackable_streaks WHERE trackable_id IN (OLD.trackable_id, NEW.trackable_id);
+END;
+'''
+
+CREATE_TRIGGER_STREAKS_EVENT_DELETE = '''
+CREATE TRIGGER IF NOT EXISTS trg_trackable_streaks_event_delete
+AFTER DELETE ON trackable_events
+BEGIN
+    DELETE FROM trackable_streaks WHERE trackable_id = OLD.trackable_id;
+END;
+'''
+
+CREATE_TRIGGER_STREAKS_RULE_UPDATE = '''
+CREATE TRIGGER IF NOT EXISTS trg_trackable_streaks_rule_update
+AFTER UPDATE OF config_json, created_at ON trackables
+BEGIN
+    DELETE FROM trackable_streaks WHERE trackable_id = NEW.id;
+END;
+'''
+
+# Recently archived trackables, for ChangeWatcher's polling (see keeper.api.watcher)
+CREATE_INDEX_TRACKABLES_ARCHIVED_AT = '''
+CREATE INDEX IF NOT EXISTS idx_trackables_archived_at ON trackables(archived_at)
+WHERE archived_at IS NOT NULL;
+'''
+
+# Core schema history. Append new steps with the next version number;
+# never edit a step that has shipped, its checksum is recorded on apply.
+MIGRATIONS = [
+    Migration(1, "trackables and events", [
+        CREATE_TABLE_TRACKABLES,
+        CREATE_TABLE_TRACKABLE_EVENTS,
+        CREATE_INDEX_EVENTS_TRACKABLE,
+        CREATE_INDEX_EVENTS_CREATED_AT,
+        CREATE_INDEX_TRACKABLES_PLUGIN,
+    ]),
+    Migration(2, "write-behind event journal", [
+        CREATE_TABLE_EVENT_JOURNAL,
+        INIT_EVENT_JOURNAL,
+    ]),
+    Migration(3, "materialized trackable state", [
+        CREATE_TABLE_TRACKABLE_STATE,
+        CREATE_TRIGGER_STATE_INSERT,
+        CREATE_TRIGGER_STATE_DELETE,
+        CREATE_TRIGGER_STATE_UPDATE,
+    ], backfill=Backfill(
+        "trackables",
+        RECOMPUTE_TRACKABLE_STATE.format(where="trackable_id > :start AND trackable_id <= :end"),
+        chunk_size=500,
+    )),
+    # The new indexes have the old single-column ones as prefixes
+    Migration(4, "composite event and trackable indexes", [
+        CREATE_INDEX_EVENTS_TRACKABLE_CREATED,
+        CREATE_INDEX_EVENTS_TRACKABLE_TYPE_CREATED,
+        CREATE_INDEX_EVENTS_CREATED_TRACKABLE,
+        CREATE_INDEX_TRACKABLES_TYPE_ARCHIVED,
+        "DROP INDEX IF EXISTS idx_events_trackable;",
+        "DROP INDEX IF EXISTS idx_events_created_at;",
+    ]),
+    Migration(5, "indexed task_date column", [
+        ADD_COLUMN_TASK_DATE,
+        CREATE_INDEX_TRACKABLES_TYPE_TASK_DATE,
+    ]),
+    Migration(6, "daily rollup", [
+        CREATE_TABLE_DAILY_ROLLUP,
+        CREATE_TRIGGER_ROLLUP_TRACKABLE_INSERT,
+        CREATE_TRIGGER_ROLLUP_TRACKABLE_UPDATE,
+        CREATE_TRIGGER_ROLLUP_TRACKABLE_DELETE,
+        CREATE_TRIGGER_ROLLUP_STATE_INSERT,
+        CREATE_TRIGGER_ROLLUP_STATE_UPDATE,
+        CREATE_TRIGGER_ROLLUP_STATE_DELETE,
+        *REBUILD_DAILY_ROLLUP,
+    ]),
+    Migration(7, "cached streaks", [
+        CREATE_TABLE_TRACKABLE_STREAKS,
+        CREATE_TRIGGER_STREAKS_EVENT_UPDATE,
+        CREATE_TRIGGER_STREAKS_EVENT_DELETE,
+        CREATE_TRIGGER_STREAKS_RULE_UPDATE,
+    ]),
+    Migration(8, "archived_at index", [
+        CREATE_INDEX_TRACKABLES_ARCHIVED_AT,
+    ]),
+]
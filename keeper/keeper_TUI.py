@@ -4,11 +4,16 @@ Keeper TUI - Main application
 from textual.app import App, ComposeResult
 from textual.containers import Vertical
 from textual.binding import Binding
+from textual.worker import WorkerState
 
+from keeper.api import write_queue
+from keeper.api.watcher import ChangeWatcher, POLL_INTERVAL
 from keeper.config.auth_handler import AuthHandler
+from keeper.db.migrations import pending_backfills, run_backfills
 from keeper.ui.plugin_loader import load_plugin_uis
 from keeper.ui.sidebar import Sidebar
 from keeper.ui.bottom_bar import BottomBar
+from keeper.ui.change_listener import ChangeListener
 from keeper.ui.plugin_container import PluginContainer
 from keeper.ui.keybindings_screen import KeybindingsScreen
 
@@ -67,12 +72,36 @@ class KeeperApp(App):
         # Initialize database
         AuthHandler.init()
         
+        # Write events a previous run left in the journal
+        write_queue.recover()
+        
+        # Show writes from other processes (e.g. CLI commands) as they land
+        self.watcher = ChangeWatcher()
+        self.set_interval(POLL_INTERVAL, self.watcher.poll)
+        
+        # Finish migration backfills in the background, chunk by chunk
+        if pending_backfills():
+            self.run_worker(run_backfills, thread=True, group="backfill")
+        
         # Load first plugin
         self.load_plugin(0)
         
         # Set initial focus to sidebar
         self.set_focus(self.query_one(Sidebar))
 
+    def on_worker_state_changed(self, event):
+        if event.worker.group == "backfill" and event.state == WorkerState.SUCCESS:
+            # Views mounted while the backfill was still filling in rows;
+            # its commits already emptied the query cache
+            for view in self.query("*"):
+                if isinstance(view, ChangeListener):
+                    view.reload()
+
+    def on_unmount(self):
+        self.watcher.close()
+        # Persist queued events before exiting
+        write_queue.shutdown()
+
     def load_plugin(self, index: int):
         """Load a plugin's UI by index"""
         if 0 <= index < len(self.plugins):
@@ -1,12 +1,14 @@
 # sample migration file for calendar plugin
+from keeper.db.migrations import Migration
 
-def create_tables(conn):
-    conn.execute("""
+MIGRATIONS = [
+    Migration(1, "create my_plugin_table", ["""
     CREATE TABLE IF NOT EXISTS my_plugin_table (
         id INTEGER PRIMARY KEY,
         data TEXT
     )
-    """)
+    """]),
+]
 
 def drop_tables(conn):
-    conn.execute("DROP TABLE IF EXISTS my_plugin_table")
\ No newline at end of file
+    conn.execute("DROP TABLE IF EXISTS my_plugin_table")
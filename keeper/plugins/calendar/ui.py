@@ -3,13 +3,19 @@ Calendar plugin UI for Keeper TUI
 Main interface showing tasks, points, and streaks
 """
 from datetime import datetime, timedelta
+from textual import work
 from textual.widgets import Static, Input, Button
 from textual.reactive import reactive
 from textual.screen import ModalScreen
 from textual.containers import Vertical, Horizontal, Grid
 from keeper.ui.base_plugin import BasePluginUI
-from keeper.api import trackables
+from keeper.ui.change_listener import ChangeListener
+from keeper.api import async_trackables, changes, trackables
 import calendar
+from collections import OrderedDict
+
+# Periods (months, weeks or days) kept in memory for instant paging
+PERIOD_CACHE_SIZE = 9
 
 
 class AddTaskFromCalendarScreen(ModalScreen):
@@ -122,7 +128,7 @@ class CalendarTopBar(Static):
             )
 
 
-class CalendarView(Static):
+class CalendarView(ChangeListener, Static):
     """Main calendar view widget"""
     can_focus = True
     current_date = reactive(datetime.now())
@@ -142,53 +148,227 @@ class CalendarView(Static):
     
     def __init__(self):
         super().__init__()
+        # Tasks of the period on screen, by date
         self.tasks_by_date = {}
+        # trackable id -> its entry in tasks_by_date, for patching in place
+        self.tasks_by_id = {}
+        # Per-day CompletionRate of the period on screen, for its stats
+        self.rate = None
+        # (start, end) -> (tasks_by_date, tasks_by_id, rate) of recently
+        # shown and prefetched periods, least recently used first
+        self.periods = OrderedDict()
+        self.prefetching = set()
+        # Bumped by every change, so fetches that started earlier are discarded
+        self.changes_seen = 0
+        # Day view: lines as last rendered, and where each task's row is
+        self.lines = []
+        self.row_lines = {}
+        self.stats_at = None
+        self.loaded_range = None
+        self.loading_range = None
         self.selected_date = datetime.now()
         self.top_bar = None
     
     def on_mount(self):
-        self.load_tasks()
+        # Starts loading the visible period
         self.render_calendar()
     
-    def load_tasks(self):
-        """Load all tasks and organize by date"""
-        import json
-        task_list = trackables.list_trackables(type_="task", archived=False)
-        self.tasks_by_date = {}
+    def week_start(self, day=None):
+        """Sunday starting the week that contains day (default current_date)"""
+        day = day or self.current_date
+        if day.weekday() == 6:  # Sunday
+            return day
+        return day - timedelta(days=day.weekday() + 1)
+    
+    def period_of(self, day):
+        """(first day, day after the last) of the current view's period containing day"""
+        if self.view_mode == "month":
+            start = day.replace(day=1)
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        elif self.view_mode == "week":
+            start = self.week_start(day)
+            end = start + timedelta(days=7)
+        else:  # day
+            start = day
+            end = start + timedelta(days=1)
+        return start, end
+    
+    def visible_range(self):
+        """(first day, day after the last) shown by the current view"""
+        return self.period_of(self.current_date.date())
+    
+    @staticmethod
+    def fetch_period(period):
+        """
+        Tasks of period as (tasks_by_date, tasks_by_id, rate), rate being
+        its per-day CompletionRate; runs on the database thread
+        """
+        tasks_by_date = {}
+        tasks_by_id = {}
+        for task in trackables.list_trackables_between(*period):
+            entry = CalendarView.task_entry(task)
+            tasks_by_date.setdefault(task.task_date, []).append(entry)
+            tasks_by_id[task.id] = entry
+        rate = trackables.completion_rate(None, "day", *period, type_="task")
+        return tasks_by_date, tasks_by_id, rate
+    
+    def store_period(self, period, tasks):
+        """Keep a fetched period, evicting the least recently used beyond PERIOD_CACHE_SIZE"""
+        self.periods[period] = tasks
+        self.periods.move_to_end(period)
+        for old in list(self.periods):
+            if len(self.periods) <= PERIOD_CACHE_SIZE:
+                break
+            if old != self.loaded_range:
+                del self.periods[old]
+    
+    def show_period(self, period):
+        """Make a stored period the one on screen"""
+        self.periods.move_to_end(period)
+        self.tasks_by_date, self.tasks_by_id, self.rate = self.periods[period]
+        self.loaded_range = period
+    
+    @work(exclusive=True, group="load_tasks")
+    async def load_tasks(self):
+        """
+        Load the visible period's tasks on the database thread and organize
+        by date. A newer load, or removing the view, cancels this one.
+        """
+        period = self.loading_range = self.visible_range()
+        self.loading = True
+        tasks = await async_trackables.run(self.fetch_period, period)
+        self.store_period(period, tasks)
+        self.show_period(period)
+        self.loading = False
+        # Loads again if the user moved to another period meanwhile
+        self.render_calendar()
+    
+    def reload(self):
+        """Forget every stored period and load the visible one again"""
+        self.changes_seen += 1
+        self.periods.clear()
+        self.loaded_range = None
+        self.load_tasks()
+    
+    def prefetch(self):
+        """Fetch the periods before and after the visible one in the background"""
+        start, end = self.loaded_range
+        for period in (self.period_of(start - timedelta(days=1)), self.period_of(end)):
+            if period not in self.periods and period not in self.prefetching:
+                self.prefetching.add(period)
+                self.run_worker(self.prefetch_period(period), group="prefetch")
+    
+    async def prefetch_period(self, period):
+        changes_seen = self.changes_seen
+        try:
+            tasks = await async_trackables.run(self.fetch_period, period)
+        finally:
+            self.prefetching.discard(period)
+        # A write since the fetch started may be missing from it
+        if changes_seen == self.changes_seen and period not in self.periods:
+            self.store_period(period, tasks)
+    
+    @staticmethod
+    def task_entry(task):
+        return {
+            'id': task.id,
+            'date': task.task_date,
+            'name': task.name,
+            'points': task.points,
+            'completed': task.completed,
+            'description': task.description or '',
+        }
+    
+    def on_trackables_changed(self, message):
+        """Patch only the loaded tasks a write touched"""
+        self.changes_seen += 1
+        if self.loading:
+            # The load in flight may have read from before this write
+            self.load_tasks()
+        change = message.change
+        self.patch_tasks(change.trackable_ids, archived=change.kind == changes.TRACKABLE_ARCHIVED)
+    
+    def on_write_failed(self, message):
+        """Runs before ChangeListener's, which re-reads the task"""
+        # Fetches in flight may have read the rejected event
+        self.changes_seen += 1
+    
+    @work(group="patch_tasks")
+    async def patch_tasks(self, trackable_ids, archived=False):
+        """Re-read the given tasks (or drop them if archived) on the database thread and patch every stored period"""
+        rows = {}
+        if not archived and self.periods:
+            rows = {
+                task.id: task for task in await async_trackables.get_trackables_with_status(trackable_ids)
+                if task.type == "task" and task.archived_at is None
+            }
+        touched = moved = False
+        for period, (tasks_by_date, tasks_by_id, rate) in self.periods.items():
+            start, end = (day.strftime('%Y-%m-%d') for day in period)
+            period_touched, period_moved = self.patch_period(
+                tasks_by_date, tasks_by_id, rate, trackable_ids,
+                {i: row for i, row in rows.items() if start <= row.task_date < end},
+            )
+            if period == self.loaded_range:
+                touched, moved = period_touched, period_moved
         
-        for task in task_list:
-            # Get task date from config_json
-            task_date = None
-            if task.get('config_json'):
-                try:
-                    config = json.loads(task['config_json'])
-                    task_date = config.get('task_date')
-                except:
-                    pass
-            
-            # If no date in config, use created_at
-            if not task_date and task.get('created_at'):
-                task_date = task['created_at'][:10]  # Get YYYY-MM-DD
-            
-            if task_date:
-                if task_date not in self.tasks_by_date:
-                    self.tasks_by_date[task_date] = []
-                
-                # Check if task is completed
-                events = trackables.get_trackable_events(task['id'])
-                completed = False
-                for event in reversed(events):
-                    if event['event_type'] in ['completed', 'uncompleted']:
-                        completed = (event['event_type'] == 'completed')
-                        break
-                
-                self.tasks_by_date[task_date].append({
-                    'id': task['id'],
-                    'name': task['name'],
-                    'points': task.get('points', 1),
-                    'completed': completed,
-                    'description': task.get('description', ''),
-                })
+        if not touched or self.loading:
+            return
+        date_str = self.current_date.strftime('%Y-%m-%d')
+        if self.view_mode == "day" and not moved:
+            # Same rows as on screen: repaint just the changed ones and the stats
+            tasks = self.tasks_by_date.get(date_str, [])
+            changed = [i for i, task in enumerate(tasks) if task['id'] in trackable_ids]
+            if changed:
+                self.restyle_rows(changed, stats=True)
+        else:
+            self.render_calendar()
+    
+    def patch_period(self, tasks_by_date, tasks_by_id, rate, trackable_ids, rows):
+        """
+        Apply re-read rows (only those in the period) to one period's tasks
+        and stats. Returns (touched, moved): whether any of its tasks
+        changed, and whether tasks were added, removed or changed date.
+        """
+        touched = moved = False
+        for trackable_id in trackable_ids:
+            entry = tasks_by_id.get(trackable_id)
+            row = rows.get(trackable_id)
+            if entry is None and row is None:
+                # Not in this period
+                continue
+            touched = True
+            if entry is not None:
+                self.count_task(rate, entry, -1)
+            if entry is not None and row is not None and entry['date'] == row.task_date:
+                entry.update(self.task_entry(row))
+                self.count_task(rate, entry, 1)
+                continue
+            moved = True
+            if entry is not None:
+                tasks = tasks_by_date[entry['date']]
+                tasks.remove(entry)
+                if not tasks:
+                    del tasks_by_date[entry['date']]
+                del tasks_by_id[trackable_id]
+            if row is not None:
+                entry = tasks_by_id[trackable_id] = self.task_entry(row)
+                self.count_task(rate, entry, 1)
+                tasks = tasks_by_date.setdefault(row.task_date, [])
+                tasks.append(entry)
+                tasks.sort(key=lambda task: task['id'])
+        return touched, moved
+    
+    @staticmethod
+    def count_task(rate, entry, sign):
+        """Add (sign 1) or take out (sign -1) one task in its day's bucket of rate"""
+        index = rate.buckets.index(entry['date'])
+        points = entry['points'] or 0
+        rate.total_count[index] += sign
+        rate.points_possible[index] += sign * points
+        if entry['completed']:
+            rate.completed_count[index] += sign
+            rate.points_earned[index] += sign * points
     
     def on_key(self, event):
         """Handle keyboard navigation"""
@@ -223,7 +403,7 @@ class CalendarView(Static):
                 self.top_bar.view_mode = "day"
                 self.top_bar.update_display()
             self.render_calendar()
-        elif event.key == " " or event.key == "enter":
+        elif event.key == "space" or event.key == "enter":
             self.toggle_task_done()
     
     def navigate_prev(self):
@@ -263,6 +443,8 @@ class CalendarView(Static):
             tasks = self.tasks_by_date.get(date_str, [])
             if tasks and self.cursor < len(tasks) - 1:
                 self.cursor += 1
+                self.restyle_rows([self.cursor - 1, self.cursor])
+            return
         self.render_calendar()
     
     def move_up(self):
@@ -277,20 +459,21 @@ class CalendarView(Static):
             # In day view, move to previous task
             if self.cursor > 0:
                 self.cursor -= 1
+                self.restyle_rows([self.cursor, self.cursor + 1])
+            return
         self.render_calendar()
     
     def add_new_task(self):
         """Show modal to add a new task for selected date"""
-        def handle_result(result):
-            if result:
-                self.load_tasks()
-                self.render_calendar()
-        
-        # Use current_date as the selected date
-        self.app.push_screen(AddTaskFromCalendarScreen(self.current_date), handle_result)
+        # Use current_date as the selected date; the task appears via on_trackables_changed
+        self.app.push_screen(AddTaskFromCalendarScreen(self.current_date))
     
     def toggle_task_done(self):
-        """Toggle completion status of selected task"""
+        """
+        Toggle completion status of selected task. The row, and the task in
+        every stored period, flips at once; the event is written in the
+        background and undone if that fails. Its change isn't re-read.
+        """
         if self.view_mode != "day":
             return
         
@@ -299,24 +482,64 @@ class CalendarView(Static):
         
         if tasks and self.cursor < len(tasks):
             task = tasks[self.cursor]
-            # Add completion event
-            trackables.add_trackable_event(
-                trackable_id=task['id'],
-                event_type="completed" if not task['completed'] else "uncompleted",
-                value=1.0 if not task['completed'] else 0.0
-            )
-            # Reload and re-render
-            self.load_tasks()
-            self.render_calendar()
+            completed = task['completed']
+            self.set_completed(task['id'], not completed)
+            # Fetches in flight may have read from before this write
+            self.changes_seen += 1
+            if not self.queue_toggle(task['id'], not completed):
+                self.set_completed(task['id'], completed)
+            self.restyle_rows([self.cursor], stats=True)
+    
+    def set_completed(self, trackable_id, completed):
+        """Mark a task done or not, and adjust the stats, in every stored period"""
+        for tasks_by_date, tasks_by_id, rate in self.periods.values():
+            entry = tasks_by_id.get(trackable_id)
+            if entry is not None and entry['completed'] != completed:
+                self.count_task(rate, entry, -1)
+                entry['completed'] = completed
+                self.count_task(rate, entry, 1)
+    
+    def period_totals(self):
+        """(completed tasks, tasks, points earned, points possible) of the period on screen"""
+        rate = self.rate
+        return sum(rate.completed_count), sum(rate.total_count), sum(rate.points_earned), sum(rate.points_possible)
+    
+    def stats_lines(self, title, totals):
+        """Task and points summary from (completed tasks, tasks, points earned, points possible)"""
+        completed_tasks, total_tasks, completed_points, total_points = totals
+        
+        lines = [f"{title}:"]
+        lines.append(f"  Tasks: {completed_tasks}/{total_tasks} completed")
+        lines.append(f"  Points: {completed_points}/{total_points}")
+        if total_points > 0:
+            progress = int((completed_points / total_points) * 20)
+            bar = "█" * progress + "░" * (20 - progress)
+            percentage = int((completed_points / total_points) * 100)
+            lines.append(f"  [{bar}] {percentage}%")
+        return lines
     
     def render_calendar(self):
         """Render the calendar based on current view mode"""
+        period = self.visible_range()
+        if period != self.loaded_range:
+            if period in self.periods:
+                # Prefetched or seen recently
+                if self.loading:
+                    self.workers.cancel_group(self, "load_tasks")
+                    self.loading = False
+                self.show_period(period)
+            else:
+                # Renders once the period is loaded
+                if not (self.loading and period == self.loading_range):
+                    self.load_tasks()
+                return
         if self.view_mode == "month":
             self.render_month_view()
         elif self.view_mode == "week":
             self.render_week_view()
         else:
             self.render_day_view()
+        self.prefetch()
     
     def render_month_view(self):
         """Render month calendar view"""
@@ -379,35 +602,8 @@ class CalendarView(Static):
         lines.append("")
         lines.append("=" * 40)
         
-        # Calculate monthly stats
-        month_start = datetime(year, month, 1).strftime('%Y-%m-%d')
-        if month == 12:
-            month_end = datetime(year + 1, 1, 1).strftime('%Y-%m-%d')
-        else:
-            month_end = datetime(year, month + 1, 1).strftime('%Y-%m-%d')
-        
-        total_points = 0
-        completed_points = 0
-        total_tasks = 0
-        completed_tasks = 0
-        
-        for date_str, tasks in self.tasks_by_date.items():
-            if month_start <= date_str < month_end:
-                for task in tasks:
-                    total_tasks += 1
-                    total_points += task['points']
-                    if task['completed']:
-                        completed_tasks += 1
-                        completed_points += task['points']
-        
-        lines.append(f"Monthly Stats:")
-        lines.append(f"  Tasks: {completed_tasks}/{total_tasks} completed")
-        lines.append(f"  Points: {completed_points}/{total_points}")
-        if total_points > 0:
-            progress = int((completed_points / total_points) * 20)
-            bar = "█" * progress + "░" * (20 - progress)
-            percentage = int((completed_points / total_points) * 100)
-            lines.append(f"  [{bar}] {percentage}%")
+        # Monthly stats, kept with the loaded period
+        lines.extend(self.stats_lines("Monthly Stats", self.period_totals()))
         
         lines.append("")
         lines.append("[green]●[/] = Has tasks | [yellow]Yellow[/] = Today | > = Selected")
@@ -417,9 +613,7 @@ class CalendarView(Static):
     def render_week_view(self):
         """Render week calendar view"""
         # Get start of week (Sunday)
-        start_of_week = self.current_date - timedelta(days=self.current_date.weekday() + 1)
-        if self.current_date.weekday() == 6:  # Sunday
-            start_of_week = self.current_date
+        start_of_week = self.week_start()
         
         lines = []
         lines.append(f"Week of {start_of_week.strftime('%B %d, %Y')}".center(60))
@@ -460,33 +654,9 @@ class CalendarView(Static):
             
             lines.append("")
         
-        # Weekly stats
-        week_start = start_of_week.strftime('%Y-%m-%d')
-        week_end = (start_of_week + timedelta(days=7)).strftime('%Y-%m-%d')
-        
-        total_points = 0
-        completed_points = 0
-        total_tasks = 0
-        completed_tasks = 0
-        
-        for date_str, tasks in self.tasks_by_date.items():
-            if week_start <= date_str < week_end:
-                for task in tasks:
-                    total_tasks += 1
-                    total_points += task['points']
-                    if task['completed']:
-                        completed_tasks += 1
-                        completed_points += task['points']
-        
+        # Weekly stats, kept with the loaded period
         lines.append("=" * 60)
-        lines.append(f"Weekly Stats:")
-        lines.append(f"  Tasks: {completed_tasks}/{total_tasks} completed")
-        lines.append(f"  Points: {completed_points}/{total_points}")
-        if total_points > 0:
-            progress = int((completed_points / total_points) * 20)
-            bar = "█" * progress + "░" * (20 - progress)
-            percentage = int((completed_points / total_points) * 100)
-            lines.append(f"  [{bar}] {percentage}%")
+        lines.extend(self.stats_lines("Weekly Stats", self.period_totals()))
         
         self.update("\n".join(lines))
     
@@ -503,38 +673,71 @@ class CalendarView(Static):
         # Get tasks for this day
         tasks = self.tasks_by_date.get(date_str, [])
         
+        self.row_lines = {}
+        self.stats_at = None
         if tasks:
             lines.append(f"Tasks for today: ({len(tasks)} total)")
             lines.append("")
             
             for i, task in enumerate(tasks):
-                prefix = "> " if i == self.cursor else "  "
-                status = "[x]" if task['completed'] else "[ ]"
-                lines.append(f"{prefix}{status} {task['name']} ({task['points']} pts)")
-                if task.get('description'):
-                    lines.append(f"{prefix}   {task['description']}")
+                row = self.day_row(task, i == self.cursor)
+                self.row_lines[i] = (len(lines), len(row))
+                lines.extend(row)
                 lines.append("")
             
             # Daily stats
-            total_points = sum(t['points'] for t in tasks)
-            completed_points = sum(t['points'] for t in tasks if t['completed'])
-            completed_tasks = sum(1 for t in tasks if t['completed'])
-            
             lines.append("=" * 60)
-            lines.append(f"Daily Stats:")
-            lines.append(f"  Tasks: {completed_tasks}/{len(tasks)} completed")
-            lines.append(f"  Points: {completed_points}/{total_points}")
-            if total_points > 0:
-                progress = int((completed_points / total_points) * 20)
-                bar = "█" * progress + "░" * (20 - progress)
-                percentage = int((completed_points / total_points) * 100)
-                lines.append(f"  [{bar}] {percentage}%")
+            stats = self.day_stats()
+            self.stats_at = len(lines)
+            lines.extend(stats)
         else:
             lines.append("No tasks for this day.")
             lines.append("")
             lines.append("Press 'n' to add a new task.")
         
+        self.lines = lines
         self.update("\n".join(lines))
+    
+    def day_row(self, task, selected):
+        """Lines of one task in the day view"""
+        prefix = "> " if selected else "  "
+        status = "[x]" if task['completed'] else "[ ]"
+        row = [f"{prefix}{status} {task['name']} ({task['points']} pts)"]
+        if task.get('description'):
+            row.append(f"{prefix}   {task['description']}")
+        return row
+    
+    def day_stats(self):
+        """Stats of the day's tasks as held in memory, so toggling never waits on the database"""
+        tasks = self.tasks_by_date.get(self.current_date.strftime('%Y-%m-%d'), [])
+        done = [task for task in tasks if task['completed']]
+        return self.stats_lines("Daily Stats", (
+            len(done),
+            len(tasks),
+            sum(task['points'] or 0 for task in done),
+            sum(task['points'] or 0 for task in tasks),
+        ))
+    
+    def restyle_rows(self, indexes, stats=False):
+        """
+        Rebuild only the given day-view rows (and the stats) in the lines
+        last rendered, instead of the whole view
+        """
+        tasks = self.tasks_by_date.get(self.current_date.strftime('%Y-%m-%d'), [])
+        for i in indexes:
+            if i not in self.row_lines:
+                continue
+            start, count = self.row_lines[i]
+            row = self.day_row(tasks[i], i == self.cursor)
+            if len(row) != count:
+                # The row grew or shrank, line positions below it moved
+                self.render_day_view()
+                return
+            self.lines[start:start + count] = row
+        if stats and self.stats_at is not None:
+            # Stats are the last lines
+            self.lines[self.stats_at:] = self.day_stats()
+        self.update("\n".join(self.lines))
 
 
 class PluginUI(BasePluginUI):
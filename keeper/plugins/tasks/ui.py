@@ -1,12 +1,22 @@
 """
 Tasks plugin UI for Keeper TUI
 """
+from rich.segment import Segment
+from textual.cache import LRUCache
+from textual.geometry import Region, Size
+from textual import work
 from textual.widgets import Static, Input, Button
 from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 from textual.screen import ModalScreen
 from textual.containers import Vertical, Horizontal
 from keeper.ui.base_plugin import BasePluginUI
-from keeper.api import trackables
+from keeper.ui.change_listener import ChangeListener
+from keeper.api import async_trackables, changes, trackables
+
+# Rendered rows kept for reuse while scrolling
+STRIP_CACHE_SIZE = 1024
 
 
 class AddTaskScreen(ModalScreen):
@@ -77,8 +87,34 @@ class TasksTopBar(Static):
         )
 
 
-class TasksView(Static):
-    """Main view widget for tasks"""
+class TasksProgress(Static):
+    """Points progress shown under the task list"""
+    
+    DEFAULT_CSS = """
+        TasksProgress {
+            height: auto;
+        }
+    """
+    
+    def show_progress(self, completed_points, total_points):
+        if total_points <= 0:
+            self.update("")
+            return
+        progress = int((completed_points / total_points) * 20)
+        bar = "█" * progress + "░" * (20 - progress)
+        percentage = int((completed_points / total_points) * 100)
+        self.update(
+            "─" * 40 + "\n"
+            f"Progress: {completed_points}/{total_points} points\n"
+            f"[{bar}] {percentage}%"
+        )
+
+
+class TasksView(ChangeListener, ScrollView):
+    """
+    Main view widget for tasks. Only the rows in the viewport are rendered
+    (Textual's line API), so a keypress costs the same for 20 tasks or 50,000.
+    """
     can_focus = True
     cursor = reactive(0)
     
@@ -86,119 +122,172 @@ class TasksView(Static):
         TasksView {
             height: 1fr;
             border: solid #444;
+            overflow-x: hidden;
         }
         TasksView:focus {
             border: heavy white;
         }
     """
 
+    PLACEHOLDER = ("No tasks yet. Press 'n' to add one.", False, None, 0)
+
+    def __init__(self):
+        super().__init__()
+        self.tasks = []
+        # trackable id -> index in self.tasks, for patching single rows
+        self.index_by_id = {}
+        self.total_points = 0
+        self.completed_points = 0
+        self.progress = None
+        # (task, is cursor row, style) -> rendered row; the style changes
+        # with focus and theme
+        self._strips = LRUCache(STRIP_CACHE_SIZE)
+
     def on_mount(self):
         self.load_tasks()
-        self.watch_cursor()
 
-    def load_tasks(self):
-        """Load tasks from database"""
-        task_list = trackables.list_trackables(type_="task", archived=False)
-        self.tasks = []
-        
-        for task in task_list:
-            # Check if task is completed
-            events = trackables.get_trackable_events(task['id'])
-            completed = False
-            for event in reversed(events):
-                if event['event_type'] in ['completed', 'uncompleted']:
-                    completed = (event['event_type'] == 'completed')
-                    break
-            
-            points = task.get('points', 1)
-            self.tasks.append((task['name'], completed, task['id'], points))
-        
-        if not self.tasks:
-            self.tasks = [("No tasks yet. Press 'n' to add one.", False, None, 0)]
-        self.render_tasks()
+    @work(exclusive=True, group="load_tasks")
+    async def load_tasks(self):
+        """
+        Load tasks on the database thread while a loading indicator shows.
+        Textual cancels the worker if the view is removed first.
+        """
+        self.loading = True
+        tasks = await async_trackables.run(self.fetch_tasks)
+        self.set_tasks(tasks)
+        self.loading = False
+
+    @classmethod
+    def fetch_tasks(cls):
+        task_list = trackables.list_trackables_with_status(type_="task", archived=False)
+        return [cls.task_row(task) for task in task_list]
+
+    @staticmethod
+    def task_row(task):
+        return (task.name, task.completed, task.id, task.points)
+
+    def set_tasks(self, tasks):
+        """Replace all rows; only the visible ones are rendered"""
+        self.tasks = tasks or [self.PLACEHOLDER]
+        self.index_by_id = {task[2]: i for i, task in enumerate(self.tasks) if task[2] is not None}
+        self.total_points = sum(task[3] for task in self.tasks if task[2] is not None)
+        self.completed_points = sum(task[3] for task in self.tasks if task[2] is not None and task[1])
+        self.virtual_size = Size(0, len(self.tasks))
+        self.cursor = min(self.cursor, len(self.tasks) - 1)
+        self.show_progress()
+        self.refresh()
+
+    def set_row(self, index, task):
+        """Replace one row, repainting only it and the progress totals"""
+        old = self.tasks[index]
+        self.tasks[index] = task
+        self.total_points += task[3] - old[3]
+        self.completed_points += (task[3] if task[1] else 0) - (old[3] if old[1] else 0)
+        self.show_progress()
+        self.refresh_line(index)
+
+    def show_progress(self):
+        if self.progress is not None:
+            self.progress.show_progress(self.completed_points, self.total_points)
+
+    def on_trackables_changed(self, message):
+        """Patch only the tasks a write touched"""
+        if self.loading:
+            # The load in flight may have read from before this write
+            self.load_tasks()
+            return
+        change = message.change
+        self.patch_tasks(change.trackable_ids, archived=change.kind == changes.TRACKABLE_ARCHIVED)
+
+    @work(group="patch_tasks")
+    async def patch_tasks(self, trackable_ids, archived=False):
+        """Re-read the given tasks (or drop them if archived) on the database thread and patch their rows"""
+        rows = {}
+        if not archived:
+            rows = {
+                task.id: task for task in await async_trackables.get_trackables_with_status(trackable_ids)
+                if task.type == "task" and task.archived_at is None
+            }
+        removed = set()
+        for trackable_id in trackable_ids:
+            index = self.index_by_id.get(trackable_id)
+            if index is None:
+                continue
+            row = rows.pop(trackable_id, None)
+            if row is None:
+                removed.add(trackable_id)
+            else:
+                self.set_row(index, self.task_row(row))
+        if removed or rows:
+            # Rows come or go: reindex everything after them
+            tasks = [task for task in self.tasks if task[2] is not None and task[2] not in removed]
+            tasks.extend(self.task_row(row) for row in rows.values())
+            self.set_tasks(tasks)
 
     def on_key(self, event):
         if event.key == "n":
             self.add_new_task()
-        elif event.key == "enter" or event.key == " ":
+        elif event.key == "enter" or event.key == "space":
             self.toggle_done()
         elif event.key == "j":
             self.move_down()
         elif event.key == "k":
             self.move_up()
-        self.render_tasks()
     
     def add_new_task(self):
-        """Show modal to add a new task"""
-        def handle_result(result):
-            if result:
-                self.load_tasks()
-        self.app.push_screen(AddTaskScreen(), handle_result)
+        """Show modal to add a new task; it appears via on_trackables_changed"""
+        self.app.push_screen(AddTaskScreen())
     
     def toggle_done(self):
-        """Toggle task completion status"""
+        """
+        Toggle task completion status. The row and progress flip at once;
+        the event is written in the background and undone if that fails.
+        Its change isn't re-read: the row already shows it.
+        """
         if self.cursor < len(self.tasks) and self.tasks[self.cursor][2] is not None:
-            task = self.tasks[self.cursor]
-            # Add completion event
-            trackables.add_trackable_event(
-                trackable_id=task[2],
-                event_type="completed" if not task[1] else "uncompleted",
-                value=1.0 if not task[1] else 0.0
-            )
-            self.tasks[self.cursor] = (task[0], not task[1], task[2])
-            self.render_tasks()
-
-    def render_tasks(self):
-        """Render task list to the view"""
-        rendered = []
-        total_points = 0
-        completed_points = 0
-        
-        for i, task in enumerate(self.tasks):
-            prefix = "> " if i == self.cursor else "  "
-            status = "[x]" if task[1] else "[ ]"
-            points = task[3] if len(task) > 3 else 0
-            
-            if task[2] is not None:  # Real task (not placeholder)
-                total_points += points
-                if task[1]:  # completed
-                    completed_points += points
-                rendered.append(f"{prefix}{status} {task[0]} ({points} pts)")
-            else:
-                rendered.append(f"{prefix}{task[0]}")
-        
-        # Add progress stats if there are tasks
-        if total_points > 0:
-            rendered.append("")
-            rendered.append("─" * 40)
-            rendered.append(f"Progress: {completed_points}/{total_points} points")
-            
-            # Add progress bar
-            progress = int((completed_points / total_points) * 20)
-            bar = "█" * progress + "░" * (20 - progress)
-            percentage = int((completed_points / total_points) * 100)
-            rendered.append(f"[{bar}] {percentage}%")
-        
-        self.update("\n".join(rendered))
+            index = self.cursor
+            task = self.tasks[index]
+            self.set_row(index, (task[0], not task[1], task[2], task[3]))
+            if not self.queue_toggle(task[2], not task[1]):
+                self.set_row(self.index_by_id.get(task[2], index), task)
 
-    def watch_cursor(self):
-        self.render_tasks()
+    def row_text(self, task, selected):
+        prefix = "> " if selected else "  "
+        if task[2] is None:
+            return f"{prefix}{task[0]}"
+        status = "[x]" if task[1] else "[ ]"
+        return f"{prefix}{status} {task[0]} ({task[3]} pts)"
 
-    def on_focus(self):
-        self.render_tasks()
+    def render_line(self, y):
+        """Render one visible row (y is relative to the top of the viewport)"""
+        scroll_x, scroll_y = self.scroll_offset
+        index = scroll_y + y
+        width = self.scrollable_content_region.width
+        if index >= len(self.tasks):
+            return Strip.blank(width, self.rich_style)
+        style = self.rich_style
+        task, selected = self.tasks[index], index == self.cursor
+        key = (task, selected, style)
+        strip = self._strips.get(key)
+        if strip is None:
+            strip = Strip([Segment(self.row_text(task, selected), style)])
+            self._strips[key] = strip
+        return strip.crop_extend(scroll_x, scroll_x + width, style)
 
-    def on_blur(self):
-        self.render_tasks()
+    def watch_cursor(self, old_cursor, cursor):
+        """Restyle just the rows the cursor left and entered"""
+        self.refresh_line(old_cursor)
+        self.refresh_line(cursor)
+        # Repaints everything itself if it has to scroll
+        self.scroll_to_region(Region(0, cursor, 1, 1), animate=False)
 
     def move_down(self):
         if self.cursor < len(self.tasks) - 1:
             self.cursor += 1
-            self.render_tasks()
 
     def move_up(self):
         if self.cursor > 0:
             self.cursor -= 1
-            self.render_tasks()
 
 
 class PluginUI(BasePluginUI):
@@ -214,8 +303,12 @@ class PluginUI(BasePluginUI):
     
     @staticmethod
     def create_view():
-        """Return a list of widgets: [TopBar, MainView]"""
-        return [TasksTopBar(), TasksView()]
+        """Return a list of widgets: [TopBar, MainView, Progress]"""
+        view = TasksView()
+        progress = TasksProgress()
+        # Connect them so view can update the progress totals
+        view.progress = progress
+        return [TasksTopBar(), view, progress]
     
     @staticmethod
     def get_keybindings():
@@ -0,0 +1,97 @@
+"""
+Delivers keeper.api.changes, and failed background writes, to widgets on
+the UI thread
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from textual.message import Message
+
+from keeper.api import changes, trackables
+
+
+class TrackablesChanged(Message):
+    """A write touched the trackables in change.trackable_ids"""
+
+    def __init__(self, change: changes.Change):
+        super().__init__()
+        self.change = change
+
+
+class WriteFailed(Message):
+    """A queued write for trackable_id was rejected by the database"""
+
+    def __init__(self, trackable_id: int, error: Exception):
+        super().__init__()
+        self.trackable_id = trackable_id
+        self.error = error
+
+
+class ChangeListener:
+    """
+    Widget mixin: while mounted, every published change arrives as a
+    TrackablesChanged message, handled by on_trackables_changed(). Writes
+    from background threads are posted across safely. The widget provides
+    load_tasks() and patch_tasks(trackable_ids).
+    """
+
+    def on_mount(self):
+        # Thread inside own_changes(), whose changes aren't delivered
+        self._own_thread = None
+        self._change_callback = changes.subscribe(self._deliver_change)
+
+    def on_unmount(self):
+        changes.unsubscribe(self._change_callback)
+
+    def _deliver_change(self, change: changes.Change):
+        if self._own_thread != threading.get_ident():
+            self.post_message(TrackablesChanged(change))
+
+    @contextmanager
+    def own_changes(self):
+        """
+        Wrap writes whose rows the widget has already patched: the changes
+        they publish from this thread aren't delivered back to it.
+        """
+        self._own_thread = threading.get_ident()
+        try:
+            yield
+        finally:
+            self._own_thread = None
+
+    def reload(self):
+        """Load everything shown again, e.g. after a backfill rewrote many rows"""
+        self.load_tasks()
+
+    def write_failed_callback(self, trackable_id: int):
+        """on_error for queue_trackable_event(): arrives as a WriteFailed message"""
+        return lambda error: self.post_message(WriteFailed(trackable_id, error))
+
+    def queue_toggle(self, trackable_id: int, completed: bool) -> bool:
+        """
+        Queue the event for a task the widget has already shown as completed
+        (or not). Its change isn't delivered back. Returns False, having told
+        the user, if it couldn't be queued; the caller undoes the row.
+        """
+        try:
+            with self.own_changes():
+                trackables.queue_trackable_event(
+                    trackable_id=trackable_id,
+                    event_type="completed" if completed else "uncompleted",
+                    value=1.0 if completed else 0.0,
+                    on_error=self.write_failed_callback(trackable_id),
+                )
+        except (OSError, sqlite3.Error) as error:
+            # Couldn't even journal it, or start the queue
+            self.app.notify(f"Couldn't save task change: {error}", severity="error")
+            return False
+        if self.loading:
+            # The load in flight may have read from before this write
+            self.load_tasks()
+        return True
+
+    def on_write_failed(self, message: WriteFailed):
+        """Undo an optimistic toggle the database rejected by re-reading the task"""
+        self.app.notify(f"Couldn't save task change: {message.error}", severity="error")
+        self.patch_tasks((message.trackable_id,))
@@ -77,6 +77,356 @@ def test_api():
     
     return True
 
+def test_bulk_import():
+    """Test bulk creation of trackables and events"""
+    print("\n📦 Testing Bulk Import...")
+    
+    created = trackables.create_trackables_bulk(
+        [("task", "test", f"Bulk Task {i}") for i in range(3)]
+    )
+    print(f"   ✅ Created {created} tasks in bulk")
+    
+    task_id = trackables.create_trackable(type_="task", plugin_owner="test", name="Bulk History")
+    history = [
+        {"trackable_id": task_id, "event_type": "completed", "value": 1.0,
+         "created_at": f"2024-01-{day:02d} 08:00:00"}
+        for day in range(1, 29)
+    ]
+    added = trackables.add_trackable_events_bulk(history, chunk_size=10)
+    events = trackables.get_trackable_events(task_id)
+    print(f"   ✅ Imported {added} events in chunks of 10")
+    
+    return created == 3 and added == 28 and len(events) == 28
+
+def test_write_queue():
+    """Test write-behind events are readable before and after flushing"""
+    print("\n📝 Testing Write Queue...")
+    
+    from keeper.api import write_queue
+    
+    task_id = trackables.create_trackable(type_="task", plugin_owner="test", name="Queued Task")
+    trackables.queue_trackable_event(task_id, "completed", value=1.0)
+    before = trackables.get_trackable_events(task_id)
+    print(f"   ✅ Queued event visible before flush: {len(before) == 1}")
+    
+    write_queue.flush()
+    after = trackables.get_trackable_events(task_id)
+    print(f"   ✅ Event written with ID: {after[0]['id']}")
+    
+    return len(before) == 1 and len(after) == 1 and after[0]['id'] is not None
+
+def test_write_queue_errors():
+    """Test that a queued event the database rejects is reported and dropped"""
+    print("\n⚠️  Testing Write Queue Errors...")
+    
+    from keeper.api import write_queue
+    
+    task_id = trackables.create_trackable(type_="task", plugin_owner="test", name="Rejected Task")
+    errors = []
+    # No such trackable: the foreign key rejects it once written
+    trackables.queue_trackable_event(task_id + 1000000, "completed", on_error=errors.append)
+    trackables.queue_trackable_event(task_id, "completed", on_error=errors.append)
+    write_queue.flush()
+    
+    reported = len(errors) == 1
+    print(f"   ✅ Rejected event reported: {errors}")
+    kept = trackables.get_trackable_state(task_id).completed
+    print(f"   ✅ Other events in the batch kept: {kept}")
+    
+    # A database that keeps failing: give up after MAX_RETRIES instead of blocking flush()
+    saved = trackables.INSERT_EVENT_SQL, write_queue.RETRY_DELAY
+    trackables.INSERT_EVENT_SQL, write_queue.RETRY_DELAY = "INSERT INTO no_such_table VALUES (?, ?, ?, ?, ?, ?)", 0.01
+    try:
+        trackables.queue_trackable_event(task_id, "uncompleted", on_error=errors.append)
+        gave_up = write_queue.flush(timeout=5)
+    finally:
+        trackables.INSERT_EVENT_SQL, write_queue.RETRY_DELAY = saved
+    dropped = gave_up and len(errors) == 2 and not write_queue.pending_events(task_id)
+    print(f"   ✅ Persistent failure reported after {write_queue.MAX_RETRIES} tries: {dropped}")
+    
+    return reported and kept and dropped
+
+def test_write_queue_journal_lock():
+    """Test that a second queue on the same database leaves the first one's journal alone"""
+    print("\n🔒 Testing Write Queue Journal Lock...")
+
+    from keeper.api import write_queue
+    from keeper.db.db import get_connection
+
+    task_id = trackables.create_trackable(type_="task", plugin_owner="test", name="Two Queues Task")
+    owner = write_queue.get_queue()
+    saved = write_queue.FLUSH_DELAY
+    # Hold the owner's event in its journal until flush()
+    write_queue.FLUSH_DELAY = 60
+    try:
+        trackables.queue_trackable_event(task_id, "completed", value=1.0)
+        with open(owner.journal_path) as f:
+            journaled = f.read()
+        last_seq = get_connection().execute("SELECT last_seq FROM event_journal WHERE id = 1").fetchone()[0]
+
+        # Stands in for another process: the journal's lock is already taken
+        other = write_queue.EventWriteQueue()
+        other.start()
+        replayed = other.pending()
+        other.enqueue(task_id, "uncompleted", value=0.0)
+        other.flush()
+        other.stop()
+        with open(owner.journal_path) as f:
+            untouched = f.read() == journaled
+        seq_kept = get_connection().execute("SELECT last_seq FROM event_journal WHERE id = 1").fetchone()[0] == last_seq
+    finally:
+        write_queue.FLUSH_DELAY = saved
+    print(f"   ✅ Journal and last_seq left to the owner: {untouched and seq_kept}")
+    print(f"   ✅ Owner's entries not replayed: {not replayed}")
+
+    write_queue.flush()
+    events = trackables.get_trackable_events(task_id)
+    print(f"   ✅ Owner still writes its own: {len(events)} events")
+
+    return untouched and seq_kept and not replayed and len(events) == 2
+
+def test_connection_reuse():
+    """Test that calls share the thread's warm connection"""
+    print("\n🔌 Testing Connection Reuse...")
+    
+    from keeper.db.db import get_db, get_connection
+    
+    conn = get_connection()
+    with get_db() as outer:
+        with get_db() as inner:
+            same = outer is inner is conn
+    print(f"   ✅ Nested get_db() reused the warm connection: {same}")
+    
+    return same
+
+def test_query_cache():
+    """Test that repeated reads are cached until the next write"""
+    print("\n🗃️  Testing Query Cache...")
+    
+    from keeper.api.cache import cache_info
+    
+    trackables.list_trackables(type_="task")
+    hits = cache_info()["hits"]
+    before = trackables.list_trackables(type_="task")
+    cached = cache_info()["hits"] == hits + 1
+    print(f"   ✅ Second read served from cache: {cached}")
+    
+    task_id = trackables.create_trackable("task", "test", "Cache Task")
+    after = trackables.list_trackables(type_="task")
+    fresh = len(after) == len(before) + 1 and task_id in {t.id for t in after}
+    print(f"   ✅ Write invalidated the cache: {fresh}")
+    
+    # Changing a result must not leak into the next cache hit
+    first = trackables.get_trackable(task_id)
+    first.name = "Changed"
+    first.config["task_date"] = "2000-01-01"
+    again = trackables.get_trackable(task_id)
+    isolated = again.name == "Cache Task" and "task_date" not in again.config
+    print(f"   ✅ Cached rows are copies: {isolated}")
+    
+    # Writes outside keeper.api on this thread's connection (e.g. backfills)
+    from keeper.db.db import get_db
+    trackables.list_trackables(type_="task")
+    with get_db() as conn:
+        conn.execute("UPDATE trackables SET name = 'Backfilled' WHERE id = ?", (task_id,))
+    backfilled = any(t.name == "Backfilled" for t in trackables.list_trackables(type_="task"))
+    print(f"   ✅ Direct write invalidated the cache: {backfilled}")
+    
+    return cached and fresh and isolated and backfilled
+
+def test_event_ranges():
+    """Test range queries and per-day event counts"""
+    print("\n📅 Testing Event Ranges...")
+    
+    task_id = trackables.create_trackable("task", "test", "Range Task")
+    trackables.add_trackable_events_bulk([
+        (task_id, "completed", 1.0, None, None, "2023-05-01 08:00:00"),
+        (task_id, "completed", 1.0, None, None, "2023-05-01 20:00:00"),
+        (task_id, "uncompleted", 0.0, None, None, "2023-05-03 09:00:00"),
+        (task_id, "completed", 1.0, None, None, "2023-06-01 00:00:00"),
+    ])
+    
+    events = trackables.get_events_in_range("2023-05-01", "2023-06-01", [task_id])
+    in_range = len(events) == 3
+    print(f"   ✅ Events in May: {len(events)}")
+    
+    counts = trackables.count_events_by_day("2023-05-01", "2023-06-01", [task_id], ["completed"])
+    by_day = counts == {"2023-05-01": 2}
+    print(f"   ✅ Completions per day: {counts}")
+    
+    # A datetime bound is compared to the second
+    from datetime import datetime
+    afternoon = trackables.get_events_in_range(datetime(2023, 5, 1, 12, 0), "2023-06-01", [task_id])
+    timed = len(afternoon) == 2
+    print(f"   ✅ Events after noon on May 1st: {len(afternoon)}")
+    
+    return in_range and by_day and timed
+
+def test_daily_rollup():
+    """Test that the daily rollup follows completions and archiving"""
+    print("\n📊 Testing Daily Rollup...")
+    
+    config = '{"task_date": "2023-02-14"}'
+    first = trackables.create_trackable("task", "test", "Rollup A", points=3, config_json=config)
+    second = trackables.create_trackable("task", "test", "Rollup B", points=2, config_json=config)
+    trackables.add_trackable_event(first, "completed")
+    trackables.queue_trackable_event(second, "completed")
+    
+    def totals():
+        rollups = trackables.get_daily_rollups("2023-02-14", "2023-02-15", type_="task", plugin_owner="test")
+        return [(r.completed_count, r.total_count, r.points_earned, r.points_possible) for r in rollups]
+    
+    queued = totals() == [(2, 2, 5, 5)]
+    print(f"   ✅ Queued completion counted: {queued}")
+    
+    trackables.archive_trackable(second)
+    archived = totals() == [(1, 1, 3, 3)]
+    print(f"   ✅ Archived task removed: {archived}")
+    
+    # A datetime range still covers its whole first day
+    from datetime import datetime
+    morning = datetime(2023, 2, 14, 9, 30)
+    same_day = len(trackables.get_daily_rollups(morning, "2023-02-15", type_="task", plugin_owner="test")) == 1
+    listed = first in [t.id for t in trackables.list_trackables_between(morning, "2023-02-15", plugin_owner="test")]
+    print(f"   ✅ Datetime start keeps its day: {same_day and listed}")
+    
+    return queued and archived and same_day and listed
+
+def test_streaks():
+    """Test streaks for an every-other-Friday habit"""
+    print("\n🔥 Testing Streaks...")
+    
+    from keeper.api import streaks
+    
+    config = '{"repeat_rule": "RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=FR", "task_date": "2023-01-06"}'
+    habit_id = trackables.create_trackable("habit", "test", "Fortnightly Review", config_json=config)
+    # Fridays two weeks apart, then a gap of four weeks
+    for day in ("2023-01-06", "2023-01-20", "2023-02-03", "2023-03-03"):
+        trackables.add_trackable_events_bulk([(habit_id, "completed", 1.0, None, None, f"{day} 18:00:00")])
+    streak = streaks.get_streak(habit_id)
+    counted = (streak.longest_streak, streak.last_counted_day) == (3, "2023-03-03")
+    print(f"   ✅ Longest streak {streak.longest_streak}, last counted {streak.last_counted_day}")
+    
+    # Backdating the missed Friday joins both runs
+    trackables.add_trackable_events_bulk([(habit_id, "completed", 1.0, None, None, "2023-02-17 18:00:00")])
+    streak = streaks.get_streak(habit_id)
+    joined = streak.longest_streak == 5
+    print(f"   ✅ Backdated completion joined the runs: {joined}")
+    
+    # A completion written after, but timestamped before, that day's undo doesn't count
+    daily_id = trackables.create_trackable("habit", "test", "Out Of Order", config_json='{"task_date": "2024-01-01"}')
+    trackables.add_trackable_events_bulk([(daily_id, "uncompleted", None, None, None, "2024-01-09 23:00:00")])
+    trackables.add_trackable_events_bulk([(daily_id, "completed", 1.0, None, None, "2024-01-09 20:00:00")])
+    streak = streaks.get_streak(daily_id)
+    in_order = (streak.current_streak, streak.longest_streak, streak.last_counted_day) == (0, 0, None)
+    print(f"   ✅ Out-of-order completion ignored: {in_order}")
+    
+    return counted and joined and in_order
+
+def test_completion_rate():
+    """Test per-bucket completion rates"""
+    print("\n📈 Testing Completion Rate...")
+    
+    ids = [
+        trackables.create_trackable("task", "rates", f"Rate {day}", points=2,
+                                    config_json=f'{{"task_date": "2022-03-{day:02d}"}}')
+        for day in (1, 2, 15)
+    ]
+    trackables.add_trackable_event(ids[0], "completed")
+    
+    monthly = trackables.completion_rate(None, "month", "2022-01-01", "2022-05-01", plugin_owner="rates")
+    filled = monthly.buckets == ["2022-01", "2022-02", "2022-03", "2022-04"]
+    counts = monthly.total_count == [0, 0, 3, 0] and monthly.points_earned == [0, 0, 2, 0]
+    print(f"   ✅ Monthly buckets: {list(zip(monthly.buckets, monthly.rates))}")
+    
+    # 2022-02-27 and 2022-03-13 are Sundays
+    weekly = trackables.completion_rate(ids[:2], "week", "2022-02-27", "2022-03-20")
+    by_week = weekly.buckets == ["2022-02-27", "2022-03-06", "2022-03-13"] and weekly.rates == [0.5, 0.0, 0.0]
+    print(f"   ✅ Weekly rates for two tasks: {weekly.rates}")
+    
+    return filled and counts and by_week
+
+def test_change_bus():
+    """Test that writes publish the trackables they touched"""
+    print("\n📣 Testing Change Bus...")
+    
+    from keeper.api import changes
+    
+    seen = []
+    callback = changes.subscribe(seen.append)
+    try:
+        task_id = trackables.create_trackable("task", "test", "Bus Task")
+        trackables.add_trackable_event(task_id, "completed")
+        trackables.create_trackables_bulk([("task", "test", "Bus Bulk 1"), ("task", "test", "Bus Bulk 2")])
+        trackables.archive_trackable(task_id)
+    finally:
+        changes.unsubscribe(callback)
+    
+    kinds = [change.kind for change in seen]
+    ordered = kinds == ["trackable_created", "event_added", "trackable_created", "trackable_archived"]
+    print(f"   ✅ Published: {kinds}")
+    
+    bulk_ids = seen[2].trackable_ids
+    bulk = [t.name for t in trackables.get_trackables_with_status(bulk_ids)] == ["Bus Bulk 1", "Bus Bulk 2"]
+    ids = seen[0].trackable_ids == (task_id,) and seen[3].trackable_ids == (task_id,)
+    print(f"   ✅ Bulk create published ids {list(bulk_ids)}")
+    
+    return ordered and bulk and ids
+
+def test_change_watcher():
+    """Test that writes from another process are picked up by polling, and this process's aren't repeated"""
+    print("\n👀 Testing Change Watcher...")
+    
+    import sqlite3
+    import threading
+    from keeper.api import changes, write_queue
+    from keeper.api.watcher import ChangeWatcher
+    from keeper.db import db
+    
+    archived_id = trackables.create_trackable("task", "test", "Watched Archive")
+    watcher = ChangeWatcher()
+    idle = not watcher.poll()
+    print(f"   ✅ Nothing to report before any write: {idle}")
+    
+    seen = []
+    callback = changes.subscribe(seen.append)
+    try:
+        # Written and published by this process, on the queue's and another thread's connections
+        trackables.queue_trackable_event(archived_id, "completed")
+        watcher.poll()
+        write_queue.flush()
+        thread = threading.Thread(target=trackables.add_trackable_event, args=(archived_id, "uncompleted"))
+        thread.start()
+        thread.join()
+        seen.clear()
+        repeated = watcher.poll()
+        print(f"   ✅ In-process writes not published again: {not repeated and not seen}")
+        
+        # A plain connection stands in for a CLI process
+        conn = sqlite3.connect(db.DB_PATH)
+        with conn:
+            created = conn.execute(
+                "INSERT INTO trackables (type, plugin_owner, name) VALUES ('task', 'test', 'Watched Task')"
+            ).lastrowid
+            conn.execute("INSERT INTO trackable_events (trackable_id, event_type) VALUES (?, 'completed')", (created,))
+            conn.execute("UPDATE trackables SET archived_at = datetime('now') WHERE id = ?", (archived_id,))
+        conn.close()
+        polled = watcher.poll()
+        again = watcher.poll()
+    finally:
+        changes.unsubscribe(callback)
+        watcher.close()
+    
+    published = [(change.kind, change.trackable_ids) for change in seen]
+    expected = [
+        ("trackable_created", (created,)),
+        ("event_added", (created,)),
+        ("trackable_archived", (archived_id,)),
+    ]
+    print(f"   ✅ Published: {published}")
+    
+    return idle and not repeated and polled and not again and published == expected
+
 def test_app_init():
     """Test app initialization"""
     print("\n🚀 Testing App Initialization...")
@@ -168,6 +518,18 @@ def main():
         "Database": test_database(),
         "Plugins": test_plugins(),
         "API": test_api(),
+        "Bulk Import": test_bulk_import(),
+        "Write Queue": test_write_queue(),
+        "Write Queue Errors": test_write_queue_errors(),
+        "Write Queue Journal Lock": test_write_queue_journal_lock(),
+        "Connection Reuse": test_connection_reuse(),
+        "Query Cache": test_query_cache(),
+        "Event Ranges": test_event_ranges(),
+        "Daily Rollup": test_daily_rollup(),
+        "Streaks": test_streaks(),
+        "Completion Rate": test_completion_rate(),
+        "Change Bus": test_change_bus(),
+        "Change Watcher": test_change_watcher(),
         "App Init": test_app_init(),
     }
     
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Query plan regression suite: runs every keeper.api.trackables and
+keeper.api.streaks function, and the change watcher's polling,
+against a scratch database, captures the SQL it executes and fails if
+EXPLAIN QUERY PLAN shows a full table SCAN for any of it.
+"""
+import inspect
+import json
+import os
+import sys
+import tempfile
+import threading
+
+# Add keeper module to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from keeper.api import streaks, trackables, write_queue
+from keeper.api.watcher import ChangeWatcher
+from keeper.db import db
+
+# Modules whose public functions must all have a case
+API_MODULES = (trackables, streaks)
+
+# Calls that list a whole table on purpose and may scan it
+FULL_LISTINGS = {"list_trackables()", "list_trackables_with_status()"}
+
+
+def record_events(trackable_id):
+    with db.get_db() as conn:
+        streaks.record_events(conn, [(trackable_id, "completed", "2024-03-01 10:00:00")])
+
+
+def poll_after_external_write(task_id, habit_id):
+    """ChangeWatcher setup and a poll that finds rows written by another connection."""
+    watcher = ChangeWatcher()
+    def write():
+        trackables.add_trackable_event(task_id, "completed")
+        trackables.archive_trackable(habit_id)
+    thread = threading.Thread(target=write)
+    thread.start()
+    thread.join()
+    watcher.poll()
+    watcher.close()
+
+
+def api_calls(task_id, habit_id):
+    """(label, call) for every public API function, with and without filters."""
+    return [
+        ("create_trackable", lambda: trackables.create_trackable("task", "test", "Plan Task")),
+        ("create_trackables_bulk", lambda: trackables.create_trackables_bulk([("task", "test", "Bulk")])),
+        ("get_trackable", lambda: trackables.get_trackable(task_id)),
+        ("list_trackables()", lambda: trackables.list_trackables()),
+        ("list_trackables(type, archived)", lambda: trackables.list_trackables(type_="task", archived=False)),
+        ("list_trackables(plugin_owner)", lambda: trackables.list_trackables(plugin_owner="core.tasks")),
+        ("list_trackables_with_status()", lambda: trackables.list_trackables_with_status()),
+        ("list_trackables_with_status(type, archived)",
+         lambda: trackables.list_trackables_with_status(type_="task", archived=False)),
+        ("get_trackables_with_status", lambda: trackables.get_trackables_with_status([task_id, habit_id])),
+        ("list_trackables_between",
+         lambda: trackables.list_trackables_between("2024-03-01", "2024-04-12")),
+        ("iter_trackables(type, archived)",
+         lambda: list(trackables.iter_trackables(type_="task", archived=False, page_size=50))),
+        ("iter_trackables(after)", lambda: list(trackables.iter_trackables(after=100, limit=20))),
+        ("archive_trackable", lambda: trackables.archive_trackable(habit_id)),
+        ("add_trackable_event", lambda: trackables.add_trackable_event(task_id, "completed")),
+        ("add_trackable_events_bulk",
+         lambda: trackables.add_trackable_events_bulk([(task_id, "uncompleted")])),
+        ("queue_trackable_event", lambda: trackables.queue_trackable_event(task_id, "completed")),
+        ("get_trackable_events", lambda: trackables.get_trackable_events(task_id)),
+        ("get_trackable_events(event_type)",
+         lambda: trackables.get_trackable_events(task_id, event_type="completed")),
+        ("iter_trackable_events",
+         lambda: list(trackables.iter_trackable_events(task_id, page_size=5))),
+        ("iter_trackable_events(event_type, after)",
+         lambda: list(trackables.iter_trackable_events(
+             task_id, event_type="completed", after=("2024-06-01 00:00:00", 0), page_size=5))),
+        ("get_events_in_range", lambda: trackables.get_events_in_range("2024-03-01", "2024-03-08")),
+        ("get_events_in_range(trackable_ids, event_types)",
+         lambda: trackables.get_events_in_range("2024-01-01", "2025-01-01", [task_id, habit_id], ["completed"])),
+        ("count_events_by_day", lambda: trackables.count_events_by_day("2024-03-01", "2024-04-01")),
+        ("count_events_by_day(trackable_ids, event_types)",
+         lambda: trackables.count_events_by_day("2024-01-01", "2025-01-01", [task_id], ["completed"])),
+        ("get_trackable_state", lambda: trackables.get_trackable_state(task_id)),
+        ("get_latest_events", lambda: trackables.get_latest_events([task_id, habit_id])),
+        ("get_latest_events(event_types)",
+         lambda: trackables.get_latest_events([task_id, habit_id], ["completed", "uncompleted"])),
+        ("get_daily_rollups", lambda: trackables.get_daily_rollups("2024-03-01", "2024-04-01")),
+        ("get_daily_rollups(type)",
+         lambda: (trackables.queue_trackable_event(task_id, "completed"),
+                  trackables.get_daily_rollups("2024-01-01", "2025-01-01", type_="task"))),
+        ("completion_rate", lambda: trackables.completion_rate(None, "year", "2020-01-01", "2025-01-01")),
+        ("completion_rate(trackable_ids, type)",
+         lambda: trackables.completion_rate([task_id, habit_id], "week", "2024-01-01", "2024-07-01", type_="task")),
+        ("get_streak", lambda: streaks.get_streak(task_id)),
+        ("get_streaks", lambda: streaks.get_streaks([task_id, habit_id])),
+        ("record_events", lambda: record_events(task_id)),
+        ("ChangeWatcher.poll", lambda: poll_after_external_write(task_id, habit_id)),
+    ]
+
+
+def full_scans(conn, sql):
+    """Plan lines of `sql` that scan a whole table (virtual tables excepted)."""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return [
+        row[3] for row in plan
+        if row[3].startswith("SCAN ") and "VIRTUAL TABLE" not in row[3]
+    ]
+
+
+def seed():
+    """Enough rows that the planner prefers indexes over scanning."""
+    trackables.create_trackables_bulk(
+        [("task" if i % 3 else "habit", f"core.plugin{i % 5}", f"Seed {i}", None, None, 1,
+          json.dumps({"task_date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}"}))
+         for i in range(300)]
+    )
+    trackables.add_trackable_events_bulk(
+        [(i % 300 + 1, "completed" if i % 2 else "uncompleted", 1.0, None, None,
+          f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:00:00") for i in range(3000)]
+    )
+
+
+def test_every_api_function_is_covered():
+    """New API functions must be added to api_calls()"""
+    print("📋 Checking API coverage...")
+    public = {
+        name for module in API_MODULES
+        for name, fn in inspect.getmembers(module, inspect.isfunction)
+        if fn.__module__ == module.__name__ and not name.startswith("_")
+    }
+    covered = {label.split("(")[0] for label, _ in api_calls(1, 2)}
+    missing = public - covered
+    for name in sorted(missing):
+        print(f"   ❌ {name} has no query plan case")
+    assert not missing
+
+
+def test_api_queries_use_indexes():
+    """No API query may fall back to a full table scan"""
+    print("\n🔍 Checking query plans...")
+    saved_path = db.DB_PATH
+    write_queue.shutdown()
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "plans.db")
+        try:
+            db.init_database()
+            seed()
+            task_id = trackables.create_trackable("task", "core.tasks", "Plan Task")
+            habit_id = trackables.create_trackable("habit", "core.tasks", "Plan Habit")
+            conn = db.get_connection()
+            failures = []
+            for label, call in api_calls(task_id, habit_id):
+                statements = []
+                conn.set_trace_callback(statements.append)
+                try:
+                    call()
+                    write_queue.flush()
+                finally:
+                    conn.set_trace_callback(None)
+                for sql in statements:
+                    if sql.lstrip().split()[0].upper() not in ("SELECT", "WITH", "UPDATE", "DELETE"):
+                        continue
+                    scans = full_scans(conn, sql)
+                    if scans and label not in FULL_LISTINGS:
+                        failures.append((label, scans))
+                        print(f"   ❌ {label}: {'; '.join(scans)}")
+                if not any(f[0] == label for f in failures):
+                    print(f"   ✅ {label}")
+        finally:
+            write_queue.shutdown()
+            db.close_connection()
+            db.DB_PATH = saved_path
+    assert not failures
+
+
+def main():
+    """Run the query plan suite"""
+    print("=" * 60)
+    print("KEEPER QUERY PLAN SUITE")
+    print("=" * 60)
+    try:
+        test_every_api_function_is_covered()
+        test_api_queries_use_indexes()
+    except AssertionError:
+        print("\n❌ Query plan regression")
+        return 1
+    print("\n🎉 All API queries use indexes!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())